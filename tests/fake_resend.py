@@ -0,0 +1,109 @@
+"""A local fake of Resend's send endpoints, for the outbox tests and manual checks.
+
+Run `python tests/fake_resend.py --port 8025 --fail 2` and point RESEND_API_URL
+at it to exercise the retry path of a real run.
+"""
+
+import argparse
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class _FakeResendHandler(BaseHTTPRequestHandler):
+    """Accepts Resend send requests, failing the first few with 503."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        if self.server.requests <= self.server.fail:
+            if self.server.verbose:
+                print(f"{self.path}: failing request {self.server.requests} with 503")
+            self._reply(503, {"name": "internal_server_error", "statusCode": 503})
+            return
+
+        emails = body if isinstance(body, list) else [body]
+        key = self.headers.get("Idempotency-Key")
+        self.server.sent.append((key, emails))
+        if self.server.verbose:
+            print(f"{self.path}: {len(emails)} emails (idempotency key {key})")
+            for email in emails:
+                print(f"  to {', '.join(email['to'])}: {email['subject']}")
+        ids = [{"id": f"fake-{self.server.requests}-{i}"} for i in range(len(emails))]
+        self._reply(200, {"data": ids} if isinstance(body, list) else ids[0])
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeResend:
+    """The fake endpoint on a free local port, served from a background thread.
+
+    `sent` lists the (idempotency key, emails) of every accepted request.
+    """
+
+    def __init__(self, fail=0, port=0, verbose=False):
+        self.server = HTTPServer(("127.0.0.1", port), _FakeResendHandler)
+        self.server.requests = 0
+        self.server.fail = fail
+        self.server.verbose = verbose
+        self.server.sent = []
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    @property
+    def sent(self):
+        return self.server.sent
+
+    def fail_next(self, count):
+        """Answers the next count requests with 503."""
+        self.server.fail = self.server.requests + count
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def send_batch(self, params, idempotency_key):
+        """A send_batch for deliver_messages that posts to this endpoint.
+
+        Error responses raise urllib's HTTPError, whose code makes 5xx retryable.
+        """
+        request = urllib.request.Request(
+            f"{self.url}/emails/batch",
+            data=json.dumps(params).encode("utf-8"),
+            headers={
+                "Content-Type": "application/json",
+                "Idempotency-Key": idempotency_key,
+            },
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake Resend endpoint.")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument(
+        "--fail", type=int, default=0, help="answer the first N requests with 503"
+    )
+    args = parser.parse_args()
+
+    fake = FakeResend(args.fail, args.port, verbose=True)
+    print(f"Fake Resend listening on {fake.url}")
+    fake.server.serve_forever()
@@ -0,0 +1,117 @@
+"""Near-duplicate clustering of tweets."""
+
+import time
+import unittest
+
+from x_digest.dedupe import cluster_tweets, collapse_near_duplicates, shingles
+
+STORY = (
+    "The central bank held interest rates steady on Wednesday and signalled "
+    "two cuts later this year as inflation cools"
+)
+OTHER_STORY = (
+    "A new open source compiler release doubles build speed for large "
+    "projects according to its maintainers"
+)
+
+
+def tweet(text, likes=0, handle="@someone"):
+    return {"text": text, "handle": handle, "metrics": {"likes": likes}}
+
+
+class ShinglesTest(unittest.TestCase):
+    def test_ignores_links_mentions_and_case(self):
+        self.assertEqual(
+            shingles("@bob Rates HELD steady https://t.co/abc"),
+            shingles("rates held steady"),
+        )
+
+    def test_wordless_text_has_no_shingles(self):
+        for text in ("https://t.co/abc", "@alice @bob", "🔥🔥🔥", ""):
+            self.assertEqual(shingles(text), set(), text)
+
+
+class ClusterTweetsTest(unittest.TestCase):
+    def test_shingleless_tweets_stay_singletons(self):
+        tweets = [
+            tweet("https://t.co/abc"),
+            tweet("@alice @bob"),
+            tweet("🔥🔥"),
+            tweet("https://t.co/def"),
+        ]
+        self.assertEqual(cluster_tweets(tweets, 0.5), [[0], [1], [2], [3]])
+
+    def test_near_duplicates_above_threshold_merge(self):
+        tweets = [
+            tweet(STORY),
+            tweet(OTHER_STORY),
+            tweet(STORY + " https://t.co/xyz"),
+            tweet("@news " + STORY.replace("Wednesday", "Wednesday,")),
+        ]
+        self.assertEqual(cluster_tweets(tweets, 0.6), [[0, 2, 3], [1]])
+
+    def test_distinct_tweets_stay_apart(self):
+        tweets = [
+            tweet(STORY),
+            tweet(OTHER_STORY),
+            tweet("Lunch was great today, thanks everyone who came along"),
+        ]
+        self.assertEqual(cluster_tweets(tweets, 0.6), [[0], [1], [2]])
+
+    def test_threshold_decides_what_merges(self):
+        # One word changed: Jaccard similarity of about 0.7
+        tweets = [tweet(STORY), tweet(STORY.replace("Wednesday", "Thursday"))]
+        self.assertEqual(cluster_tweets(tweets, 0.6), [[0, 1]])
+        self.assertEqual(cluster_tweets(tweets, 0.9), [[0], [1]])
+
+    def test_large_cluster_is_fast(self):
+        tweets = [tweet(STORY)] * 3000
+        start = time.monotonic()
+        clusters = cluster_tweets(tweets, 0.8)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(len(clusters[0]), 3000)
+        self.assertLess(time.monotonic() - start, 2)
+
+
+class CollapseNearDuplicatesTest(unittest.TestCase):
+    def test_representative_has_most_engagement(self):
+        tweets = [
+            tweet(STORY, likes=3, handle="@a"),
+            tweet(STORY + " https://t.co/1", likes=50, handle="@b"),
+            tweet(STORY, likes=10, handle="@c"),
+        ]
+        [representative] = collapse_near_duplicates(tweets, 0.6)
+        self.assertEqual(representative["handle"], "@b")
+        self.assertEqual(representative["cluster_size"], 3)
+
+    def test_representative_falls_back_to_longest_text(self):
+        tweets = [
+            tweet(STORY, handle="@a"),
+            tweet(STORY + " more", handle="@b"),
+            tweet(STORY, handle="@c"),
+        ]
+        [representative] = collapse_near_duplicates(tweets, 0.6)
+        self.assertEqual(representative["handle"], "@b")
+
+    def test_cluster_size_and_timeline_order(self):
+        tweets = [
+            tweet(OTHER_STORY, handle="@a"),
+            tweet(STORY, handle="@b"),
+            tweet(STORY, handle="@c"),
+            tweet("https://t.co/abc", handle="@d"),
+            tweet("https://t.co/def", handle="@e"),
+        ]
+        collapsed = collapse_near_duplicates(tweets, 0.6)
+        self.assertEqual(
+            [(t["handle"], t["cluster_size"]) for t in collapsed],
+            [("@a", 1), ("@b", 2), ("@d", 1), ("@e", 1)],
+        )
+        self.assertNotIn("cluster_size", tweets[1])  # Inputs are not modified
+
+    def test_zero_threshold_disables_clustering(self):
+        tweets = [tweet(STORY), tweet(STORY)]
+        self.assertIs(collapse_near_duplicates(tweets, 0), tweets)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""Parsing and rendering of Gemini's digest text."""
+
+import random
+import unittest
+
+from x_digest.digest import (
+    Category,
+    DigestItem,
+    Note,
+    StreamingDigestFormatter,
+    parse_digest,
+    render_digest_body,
+)
+
+LINK = '<a href="https://x.com/fed/status/1">view on X</a>'
+DIGEST = f"""### Economy & Rates
+@federalreserve: Rates held steady → {LINK}
+@economist_jane: Two cuts still expected this year
+
+### AI
+@lab_news: New model released -> <a href='https://x.com/lab_news/status/2'>view on X</a>
+"""
+
+
+def stream(text, chunk_sizes):
+    """Feeds text to a StreamingDigestFormatter in the given chunk sizes."""
+    formatter = StreamingDigestFormatter()
+    position = 0
+    for size in chunk_sizes:
+        formatter.feed(text[position : position + size])
+        position += size
+    formatter.feed(text[position:])
+    return formatter.finish()
+
+
+class ParseDigestTest(unittest.TestCase):
+    def test_headers_items_and_links(self):
+        digest = parse_digest(DIGEST)
+        self.assertEqual(digest.intro, [])
+        self.assertEqual(
+            digest.categories,
+            [
+                Category(
+                    "Economy & Rates",
+                    [
+                        DigestItem(
+                            "federalreserve",
+                            "Rates held steady",
+                            "https://x.com/fed/status/1",
+                            "view on X",
+                        ),
+                        DigestItem(
+                            "economist_jane",
+                            "Two cuts still expected this year",
+                            None,
+                            None,
+                        ),
+                    ],
+                    [],
+                ),
+                Category(
+                    "AI",
+                    [
+                        DigestItem(
+                            "lab_news",
+                            "New model released",
+                            "https://x.com/lab_news/status/2",
+                            "view on X",
+                        )
+                    ],
+                    [],
+                ),
+            ],
+        )
+
+    def test_notes_keep_their_position(self):
+        digest = parse_digest(
+            "Good morning!\n"
+            "### Markets\n"
+            "@a: first\n"
+            "Meanwhile, elsewhere:\n"
+            "@b: second\n"
+            "That's all for markets.\n"
+        )
+        self.assertEqual(digest.intro, ["Good morning!"])
+        [category] = digest.categories
+        self.assertEqual([item.handle for item in category.items], ["a", "b"])
+        self.assertEqual(
+            category.notes,
+            [Note(1, "Meanwhile, elsewhere:"), Note(2, "That's all for markets.")],
+        )
+
+    def test_preamble_before_final_digest_is_dropped(self):
+        digest = parse_digest(
+            "Let me think about which tweets matter.\n"
+            "@ignored: not part of the digest\n"
+            "<final_digest>\n" + DIGEST
+        )
+        self.assertEqual(digest.intro, [])
+        self.assertEqual(
+            [category.title for category in digest.categories],
+            ["Economy & Rates", "AI"],
+        )
+        self.assertNotIn(
+            "ignored",
+            [item.handle for category in digest.categories for item in category.items],
+        )
+
+
+class RenderDigestBodyTest(unittest.TestCase):
+    def test_renders_headers_lists_and_links(self):
+        html = render_digest_body(parse_digest(DIGEST))
+        self.assertEqual(
+            html.split("\n"),
+            [
+                '<div class="category-header">Economy & Rates</div>',
+                "<ol class='tweet-list'>",
+                "<li class='tweet-item'><a href=\"https://x.com/federalreserve\" "
+                'target="_blank" class="handle-link">@federalreserve</a>: '
+                'Rates held steady → <a href="https://x.com/fed/status/1" '
+                'class="tweet-link">view on X</a></li>',
+                "<li class='tweet-item'><a href=\"https://x.com/economist_jane\" "
+                'target="_blank" class="handle-link">@economist_jane</a>: '
+                "Two cuts still expected this year</li>",
+                "</ol>",
+                '<div class="category-header">AI</div>',
+                "<ol class='tweet-list'>",
+                "<li class='tweet-item'><a href=\"https://x.com/lab_news\" "
+                'target="_blank" class="handle-link">@lab_news</a>: '
+                'New model released → <a href="https://x.com/lab_news/status/2" '
+                'class="tweet-link">view on X</a></li>',
+                "</ol>",
+            ],
+        )
+
+    def test_notes_render_in_place(self):
+        html = render_digest_body(
+            parse_digest(
+                "Good morning!\n"
+                "### Markets\n"
+                "@a: first\n"
+                "Meanwhile, elsewhere:\n"
+                "@b: second\n"
+                "That's all for markets.\n"
+            )
+        )
+        lines = [line for line in html.split("\n") if not line.startswith("<li")]
+        self.assertEqual(
+            lines,
+            [
+                "Good morning!",
+                '<div class="category-header">Markets</div>',
+                "<ol class='tweet-list'>",
+                "</ol>",
+                "Meanwhile, elsewhere:",
+                "<ol class='tweet-list'>",
+                "</ol>",
+                "That's all for markets.",
+            ],
+        )
+        self.assertNotIn("<br>", html)
+
+
+class StreamingDigestFormatterTest(unittest.TestCase):
+    LINES = [
+        "### Tech",
+        "### Finance & Markets",
+        f"@a: summary → {LINK}",
+        "@b_2: plain summary",
+        "A stray note.",
+        "",
+        "   ",
+        "Preamble or closing text",
+    ]
+
+    def test_matches_batch_rendering_in_any_chunking(self):
+        rng = random.Random(7)
+        for _ in range(500):
+            text = "\n".join(rng.choice(self.LINES) for _ in range(rng.randint(0, 15)))
+            if rng.random() < 0.3:
+                text = "thinking...\n@x: draft\n<final_digest>\n" + text
+            if rng.random() < 0.5:
+                text += "\n"
+            chunks = [rng.randint(1, 12) for _ in range(len(text))]
+            with self.subTest(text=text):
+                self.assertEqual(
+                    stream(text, chunks), render_digest_body(parse_digest(text))
+                )
+
+    def test_digest_is_complete_after_finish(self):
+        formatter = StreamingDigestFormatter()
+        formatter.feed(DIGEST[:40])
+        formatter.feed(DIGEST[40:].rstrip("\n"))
+        formatter.finish()
+        self.assertEqual(formatter.digest, parse_digest(DIGEST))
+        self.assertEqual(formatter.text(), DIGEST.rstrip("\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
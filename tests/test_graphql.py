@@ -0,0 +1,92 @@
+"""Decoding of a recorded HomeTimeline GraphQL response."""
+
+import json
+import os
+import unittest
+
+from x_digest.graphql import decode_timeline_response
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "home_timeline.json")
+
+
+class DecodeTimelineResponseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURE_PATH, encoding="utf-8") as f:
+            cls.tweets = decode_timeline_response(json.load(f))
+        cls.by_id = {tweet["id"]: tweet for tweet in cls.tweets}
+
+    def test_skips_promoted_and_tombstoned_entries(self):
+        self.assertEqual(
+            [tweet["id"] for tweet in self.tweets],
+            [
+                "1850000000000000001",
+                "1850000000000000002",
+                "1849999999999999999",
+                "1850000000000000004",
+            ],
+        )
+        self.assertNotIn("1850000000000000005", self.by_id)  # Promoted
+        self.assertNotIn("1850000000000000006", self.by_id)  # Tombstone
+
+    def test_plain_tweet(self):
+        self.assertEqual(
+            self.by_id["1850000000000000001"],
+            {
+                "id": "1850000000000000001",
+                "author": "Federal Reserve",
+                "handle": "@federalreserve",
+                # t.co link expanded, trailing photo link dropped
+                "text": "The FOMC held rates steady at 4.25-4.50%. Statement: "
+                "https://www.federalreserve.gov/newsevents/pressreleases/"
+                "monetary20241030a.htm",
+                "link": "https://x.com/federalreserve/status/1850000000000000001",
+                "time": "2024-10-30T18:00:05.000Z",
+                "metrics": {
+                    "likes": 1200,
+                    "retweets": 340,
+                    "replies": 95,
+                    "quotes": 40,
+                    "bookmarks": 60,
+                    "views": 250000,
+                },
+                "retweeted_by": None,
+                "quoted": None,
+            },
+        )
+
+    def test_note_tweet_uses_full_text(self):
+        tweet = self.by_id["1850000000000000002"]
+        self.assertEqual(tweet["author"], "Alice Chen")  # Name from user.legacy
+        self.assertTrue(tweet["text"].startswith("Thread on why GPU supply"))
+        self.assertTrue(tweet["text"].endswith("packaging capacity & HBM yields."))
+        self.assertNotIn("…", tweet["text"])
+        self.assertEqual(tweet["text"].count("HBM yields"), 5)
+
+    def test_retweet_decodes_original(self):
+        tweet = self.by_id["1849999999999999999"]
+        self.assertEqual(tweet["handle"], "@technews")
+        self.assertEqual(tweet["text"], "Chip export rules updated this morning.")
+        self.assertEqual(
+            tweet["link"], "https://x.com/technews/status/1849999999999999999"
+        )
+        self.assertEqual(tweet["time"], "2024-10-30T12:00:00.000Z")
+        self.assertEqual(tweet["retweeted_by"], "@bobortiz")
+        self.assertEqual(tweet["metrics"]["views"], 1200000)
+        self.assertNotIn("1850000000000000003", self.by_id)
+
+    def test_quoted_tweet(self):
+        tweet = self.by_id["1850000000000000004"]
+        self.assertEqual(tweet["text"], "Worth reading alongside today's statement.")
+        self.assertEqual(
+            tweet["quoted"],
+            {
+                "handle": "@federalreserve",
+                "text": "Minutes of the September meeting are out.",
+                "link": "https://x.com/federalreserve/status/1849999999999999998",
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+"""Outbox delivery and retries against a local fake Resend endpoint."""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from x_digest import delivery, outbox
+from x_digest.outbox import Outbox
+
+from tests.fake_resend import FakeResend
+
+
+def make_messages(emails, digest_id="20250101-080000", html="<p>digest</p>"):
+    return [
+        {
+            "key": delivery.idempotency_key(email, digest_id),
+            "digest": digest_id,
+            "params": {
+                "from": "X Digest <digest@example.com>",
+                "to": [email],
+                "subject": "Your Daily X Digest",
+                "html": html,
+            },
+        }
+        for email in emails
+    ]
+
+
+class OutboxTest(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeResend().start()
+        self.addCleanup(self.fake.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.outbox = Outbox(directory.name)
+        # No sleeping between the in-request retries of a 5xx
+        patcher = mock.patch.object(delivery, "RETRY_BASE_DELAY", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def flush(self):
+        return self.outbox.flush(self.fake.send_batch, concurrency=2)
+
+    def make_due(self):
+        """Moves every pending retry to now, as if its backoff had elapsed."""
+        for entry in self.outbox._entries("pending"):
+            self.outbox._write("pending", dict(entry, next_attempt_at=0))
+
+    def files(self, state):
+        return os.listdir(os.path.join(self.outbox.directory, state))
+
+    def test_delivered_messages_move_to_delivered(self):
+        messages = make_messages(["a@example.com", "b@example.com"])
+        self.assertEqual(self.outbox.enqueue(messages), [])
+        self.assertEqual(len(self.files("pending")), 2)
+
+        delivered = self.flush()
+
+        self.assertEqual(
+            sorted(message["key"] for message in delivered),
+            sorted(message["key"] for message in messages),
+        )
+        self.assertEqual(self.files("pending"), [])
+        self.assertEqual(len(self.files("delivered")), 2)
+        self.assertEqual(len(self.fake.sent), 1)
+        key, emails = self.fake.sent[0]
+        self.assertEqual(key, delivery.batch_key(messages))
+        self.assertEqual(len(emails), 2)
+
+    def test_server_error_reschedules_with_backoff(self):
+        self.fake.fail_next(delivery.MAX_RETRIES + 1)
+        self.outbox.enqueue(make_messages(["a@example.com"]))
+
+        before = time.time()
+        self.assertEqual(self.flush(), [])
+
+        self.assertEqual(self.fake.requests, delivery.MAX_RETRIES + 1)
+        [entry] = self.outbox._entries("pending")
+        self.assertEqual(entry["attempts"], 1)
+        self.assertIn("503", entry["last_error"])
+        self.assertGreaterEqual(
+            entry["next_attempt_at"], before + outbox.RETRY_BASE_DELAY
+        )
+        self.assertEqual(self.outbox.pending(), [])  # Not due yet
+
+        # The second failure doubles the delay
+        self.make_due()
+        self.fake.fail_next(delivery.MAX_RETRIES + 1)
+        before = time.time()
+        self.flush()
+        [entry] = self.outbox._entries("pending")
+        self.assertEqual(entry["attempts"], 2)
+        self.assertGreaterEqual(
+            entry["next_attempt_at"], before + 2 * outbox.RETRY_BASE_DELAY
+        )
+
+    def test_gives_up_after_max_attempts(self):
+        self.fake.fail_next(10**6)
+        self.outbox.enqueue(make_messages(["a@example.com"]))
+        for _ in range(outbox.MAX_ATTEMPTS):
+            self.make_due()
+            self.flush()
+
+        self.assertEqual(self.files("pending"), [])
+        self.assertEqual(len(self.files("failed")), 1)
+        [entry] = self.outbox._entries("failed")
+        self.assertEqual(entry["attempts"], outbox.MAX_ATTEMPTS)
+        self.assertEqual(self.fake.sent, [])
+
+    def test_reenqueue_keeps_retry_state(self):
+        messages = make_messages(["a@example.com"])
+        self.fake.fail_next(delivery.MAX_RETRIES + 1)
+        self.outbox.enqueue(messages)
+        self.flush()
+
+        self.outbox.enqueue(messages)  # e.g. --resume
+
+        [entry] = self.outbox._entries("pending")
+        self.assertEqual(entry["attempts"], 1)
+        self.assertGreater(entry["next_attempt_at"], time.time())
+
+    def test_retried_batch_keeps_its_key(self):
+        first = make_messages(["a@example.com", "b@example.com"])
+        self.fake.fail_next(delivery.MAX_RETRIES + 1)
+        self.outbox.enqueue(first)
+        self.flush()
+
+        self.outbox.enqueue(make_messages(["c@example.com"], "20250101-090000"))
+        self.make_due()
+        self.flush()
+
+        keys = {
+            key: [email["to"][0] for email in emails] for key, emails in self.fake.sent
+        }
+        self.assertEqual(
+            sorted(keys[delivery.batch_key(first)]), ["a@example.com", "b@example.com"]
+        )
+        self.assertEqual(len(keys), 2)
+
+    def test_reenqueue_of_delivered_key_is_skipped(self):
+        messages = make_messages(["a@example.com"])
+        self.outbox.enqueue(messages)
+        self.flush()
+
+        self.outbox.enqueue(messages)
+
+        self.assertEqual(self.files("pending"), [])
+        self.assertEqual(self.flush(), [])
+        self.assertEqual(len(self.fake.sent), 1)
+
+    def test_resume_counts_already_delivered_messages(self):
+        messages = make_messages(["a@example.com", "b@example.com"])
+        self.outbox.enqueue(messages)
+        self.flush()
+
+        # A resumed run re-renders the same digest: both count as delivered
+        already = self.outbox.enqueue(make_messages(["a@example.com", "b@example.com"]))
+        self.assertEqual(len(already), 2)
+
+        # Different content under a delivered key is skipped but not counted
+        changed = make_messages(["a@example.com"], html="<p>other</p>")
+        self.assertEqual(self.outbox.enqueue(changed), [])
+        self.assertEqual(self.files("pending"), [])
+
+    def test_next_run_is_a_new_digest(self):
+        self.outbox.enqueue(make_messages(["a@example.com"], "20250101-080000"))
+        self.flush()
+
+        self.outbox.enqueue(make_messages(["a@example.com"], "20250101-090000"))
+        delivered = self.flush()
+
+        self.assertEqual(
+            [message["digest"] for message in delivered], ["20250101-090000"]
+        )
+        self.assertEqual(len(self.fake.sent), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
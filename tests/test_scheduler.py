@@ -0,0 +1,148 @@
+"""Cron parsing and the missed-run policy of the long-running scheduler."""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from x_digest import scheduler
+from x_digest.scheduler import CronSchedule, Scheduler
+
+
+class CronFieldTest(unittest.TestCase):
+    def test_field_syntax(self):
+        schedule = CronSchedule("*/15 9-17 1,15 */3 1-5")
+        self.assertEqual(schedule.minutes, {0, 15, 30, 45})
+        self.assertEqual(schedule.hours, set(range(9, 18)))
+        self.assertEqual(schedule.days, {1, 15})
+        self.assertEqual(schedule.months, {1, 4, 7, 10})
+        self.assertEqual(schedule.weekdays, {1, 2, 3, 4, 5})
+
+    def test_stepped_ranges_and_starts(self):
+        schedule = CronSchedule("10-20/5 5/6 * * *")
+        self.assertEqual(schedule.minutes, {10, 15, 20})
+        self.assertEqual(schedule.hours, {5, 11, 17, 23})
+
+    def test_seven_is_sunday(self):
+        self.assertEqual(CronSchedule("0 0 * * 7").weekdays, {0, 7})
+
+    def test_aliases(self):
+        self.assertEqual(CronSchedule("@daily").expression, "0 0 * * *")
+        self.assertEqual(CronSchedule(" @hourly ").minutes, {0})
+
+    def test_invalid_expressions(self):
+        for expression in (
+            "* * * *",
+            "60 * * * *",
+            "* 24 * * *",
+            "* * 0 * *",
+            "5-1 * * * *",
+            "*/0 * * * *",
+            "x * * * *",
+        ):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    CronSchedule(expression)
+
+
+class NextAfterTest(unittest.TestCase):
+    # 2025-01-03 is a Friday
+    FRIDAY = datetime(2025, 1, 3, 10, 0)
+
+    def test_strictly_after(self):
+        self.assertEqual(
+            CronSchedule("0 * * * *").next_after(self.FRIDAY),
+            datetime(2025, 1, 3, 11, 0),
+        )
+        self.assertEqual(
+            CronSchedule("* * * * *").next_after(self.FRIDAY.replace(second=30)),
+            datetime(2025, 1, 3, 10, 1),
+        )
+
+    def test_weekdays_skip_the_weekend(self):
+        self.assertEqual(
+            CronSchedule("30 9 * * 1-5").next_after(self.FRIDAY),
+            datetime(2025, 1, 6, 9, 30),
+        )
+
+    def test_day_of_month_or_day_of_week(self):
+        start = datetime(2025, 1, 1)
+        self.assertEqual(
+            CronSchedule("0 0 13 * *").next_after(start), datetime(2025, 1, 13)
+        )
+        self.assertEqual(
+            CronSchedule("0 0 * * 5").next_after(start), datetime(2025, 1, 3)
+        )
+        # Restricting both fields matches either, like cron
+        both = CronSchedule("0 0 13 * 5")
+        self.assertEqual(both.next_after(start), datetime(2025, 1, 3))
+        self.assertEqual(both.next_after(datetime(2025, 1, 10)), datetime(2025, 1, 13))
+
+    def test_month_rollover(self):
+        self.assertEqual(
+            CronSchedule("15 6 1 */3 *").next_after(datetime(2025, 2, 10)),
+            datetime(2025, 4, 1, 6, 15),
+        )
+
+    def test_never_fires(self):
+        with self.assertRaises(ValueError):
+            CronSchedule("0 0 31 2 *").next_after(self.FRIDAY)
+
+
+class MissedRunPolicyTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state_file = os.path.join(directory.name, "scheduler.json")
+        self.runs = []
+        self.latest_slot = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    def start(self, missed, last_scheduled=None):
+        """Starts a scheduler on @hourly and stops it at its first sleep."""
+        digest_scheduler = Scheduler(
+            CronSchedule("@hourly"),
+            lambda: self.runs.append(time.time()),
+            self.state_file,
+            missed=missed,
+        )
+        if last_scheduled is not None:
+            digest_scheduler._save_state(last_scheduled=last_scheduled.timestamp())
+        with mock.patch.object(scheduler.time, "sleep", side_effect=KeyboardInterrupt):
+            digest_scheduler.run_forever()
+        # Wait for a catch-up run started in the background
+        self.assertTrue(digest_scheduler._running.acquire(timeout=5))
+        return digest_scheduler.state
+
+    def test_once_catches_up_with_one_run(self):
+        state = self.start("once", self.latest_slot - timedelta(hours=3))
+        self.assertEqual(len(self.runs), 1)
+        self.assertEqual(state["last_scheduled"], self.latest_slot.timestamp())
+        self.assertEqual(state["last_status"], "ok")
+
+    def test_skip_waits_for_the_next_slot(self):
+        state = self.start("skip", self.latest_slot - timedelta(hours=3))
+        self.assertEqual(self.runs, [])
+        self.assertEqual(state["last_scheduled"], self.latest_slot.timestamp())
+        self.assertNotIn("last_started", state)
+
+    def test_nothing_missed(self):
+        state = self.start("once", self.latest_slot)
+        self.assertEqual(self.runs, [])
+        self.assertEqual(state["last_scheduled"], self.latest_slot.timestamp())
+
+    def test_first_start_does_not_catch_up(self):
+        state = self.start("once")
+        self.assertEqual(self.runs, [])
+        self.assertEqual(state, {})
+
+    def test_rejects_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            Scheduler(
+                CronSchedule("@hourly"), lambda: None, self.state_file, missed="all"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
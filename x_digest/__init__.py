@@ -0,0 +1 @@
+"""Shared helpers for the x_digest_manual and x_digest_autonomous scripts."""
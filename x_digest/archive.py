@@ -0,0 +1,465 @@
+"""Append-only columnar archive of every run's scraped tweets, for later analysis.
+
+Each run adds one segment file to the archive directory, named after the run
+ID. With pyarrow installed segments are Parquet files; otherwise they use a
+small built-in format:
+
+    header    b"XDARCH01", row count and column count (little-endian uint32s)
+    column    name (uint16 length + UTF-8), kind, data length (uint64) and zero
+              padding to 8 bytes, then the data, by kind:
+              b"i"  int64 per row
+              b"s"  rows + 1 uint64 offsets, then the UTF-8 strings back to back
+              b"d"  (dictionary) uint64 count of distinct strings, their offsets
+                    and UTF-8 as for b"s", padding to 8 bytes, uint32 index per row
+
+Built-in segments are memory-mapped and decoded lazily, so reading one column
+(say, the handles of a year of runs) never touches the tweet text. Fields
+without a column of their own (metrics, quoted tweet, retweeter, the accounts
+that saw the tweet) are kept as JSON in the "extra" column, empty when a tweet
+has none; segments written before that column existed read it as empty.
+
+    python -m x_digest.archive                   # list segments
+    python -m x_digest.archive --import-runs runs   # archive older runs/*/tweets.json
+"""
+
+import argparse
+import glob
+from contextlib import contextmanager
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+from x_digest.extract import make_tweet_record
+
+# Optional; without it segments use the built-in format
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+MAGIC = b"XDARCH01"
+HEADER = struct.Struct("<8sII")
+COLUMN_NAME_LENGTH = struct.Struct("<H")
+COLUMN_INFO = struct.Struct("<cQ")
+COUNT = struct.Struct("<Q")
+NULL_TIMESTAMP = -(2**63)  # Stands in for a missing timestamp in int64 columns
+# Column name -> kind, in file order; handles and names repeat, so they are
+# stored once per segment
+COLUMNS = {
+    "id": b"i",
+    "timestamp": b"i",
+    "handle": b"d",
+    "author": b"d",
+    "text": b"s",
+    "link": b"s",
+    "extra": b"s",
+}
+# Columns added after the first segments were written, and what older segments read
+OPTIONAL_COLUMNS = {"extra": ""}
+# Record fields that have a column of their own; the rest go to "extra"
+RECORD_FIELDS = ("id", "time", "handle", "author", "text", "link")
+SEGMENT_EXTENSIONS = {"parquet": ".parquet", "segment": ".seg"}
+TIME_FORMATS = ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_tweet_time(text):
+    """Converts a <time datetime> string to epoch milliseconds, or None."""
+    for time_format in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, time_format)
+        except (TypeError, ValueError):
+            continue
+        return int(parsed.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return None
+
+
+def format_tweet_time(timestamp):
+    """Converts epoch milliseconds back to the <time datetime> format."""
+    if timestamp is None:
+        return None
+    moment = datetime.fromtimestamp(timestamp // 1000, timezone.utc)
+    return f"{moment:%Y-%m-%dT%H:%M:%S}.{timestamp % 1000:03d}Z"
+
+
+class Tweet:
+    """A scraped tweet in compact form: int status ID, epoch-ms timestamp, interned names.
+
+    The pipeline itself passes tweet dicts around (they are checkpointed as
+    JSON); from_record() and to_record() convert between the two. extra holds
+    the record's other fields as JSON, decoded only by to_record().
+    """
+
+    __slots__ = ("id", "timestamp", "handle", "author", "text", "link", "extra")
+
+    def __init__(self, id, timestamp, handle, author, text, link, extra=""):
+        self.id = id
+        self.timestamp = timestamp
+        # Handles and names repeat across thousands of tweets
+        self.handle = sys.intern(handle)
+        self.author = sys.intern(author)
+        self.text = text
+        self.link = link
+        self.extra = extra
+
+    @classmethod
+    def from_record(cls, record):
+        extra = {
+            name: value
+            for name, value in record.items()
+            if name not in RECORD_FIELDS and value is not None
+        }
+        return cls(
+            int(record["id"]),
+            parse_tweet_time(record.get("time")),
+            record["handle"],
+            record["author"],
+            record["text"],
+            record["link"],
+            json.dumps(extra, ensure_ascii=False, sort_keys=True) if extra else "",
+        )
+
+    def to_record(self):
+        record = make_tweet_record(
+            self.author,
+            self.handle,
+            self.text,
+            self.link,
+            format_tweet_time(self.timestamp),
+        )
+        if self.extra:
+            record.update(json.loads(self.extra))
+        return record
+
+    def __eq__(self, other):
+        if not isinstance(other, Tweet):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        return f"Tweet(id={self.id}, handle={self.handle!r}, text={self.text[:30]!r})"
+
+
+def _padding(position):
+    return -position % 8
+
+
+def _pack_strings(values):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    return struct.pack(f"<{len(offsets)}Q", *offsets) + b"".join(encoded)
+
+
+def _pack_column(kind, values):
+    if kind == b"i":
+        return struct.pack(f"<{len(values)}q", *values)
+    if kind == b"s":
+        return _pack_strings(values)
+    distinct = {}
+    indices = [distinct.setdefault(value, len(distinct)) for value in values]
+    data = COUNT.pack(len(distinct)) + _pack_strings(distinct)
+    data += b"\0" * _padding(len(data))
+    return data + struct.pack(f"<{len(indices)}I", *indices)
+
+
+def write_segment(path, tweets):
+    """Writes tweets to path in the built-in columnar format."""
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(tweets), len(COLUMNS)))
+        for name, kind in COLUMNS.items():
+            values = [getattr(tweet, name) for tweet in tweets]
+            if name == "timestamp":
+                values = [
+                    NULL_TIMESTAMP if value is None else value for value in values
+                ]
+            data = _pack_column(kind, values)
+            encoded_name = name.encode("utf-8")
+            f.write(COLUMN_NAME_LENGTH.pack(len(encoded_name)) + encoded_name)
+            f.write(COLUMN_INFO.pack(kind, len(data)))
+            f.write(b"\0" * _padding(f.tell()))
+            f.write(data)
+
+
+def _int_view(view, code):
+    """Zero-copy view of little-endian integers on little-endian hosts, a list otherwise."""
+    if sys.byteorder == "little":
+        return view.cast(code)
+    return list(struct.unpack(f"<{len(view) // struct.calcsize(code)}{code}", view))
+
+
+class _StringColumn:
+    """Strings of a built-in segment column, decoded only when read."""
+
+    def __init__(self, view, rows):
+        self.rows = rows
+        self.offsets = _int_view(view[: (rows + 1) * 8], "Q")
+        self.strings = view[(rows + 1) * 8 :]
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, index):
+        if not -self.rows <= index < self.rows:
+            raise IndexError(index)
+        index %= self.rows
+        return str(self.strings[self.offsets[index] : self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        # Reading every row: one copy of the bytes beats a memoryview slice per row
+        strings = bytes(self.strings)
+        offsets = list(self.offsets)
+        for start, end in zip(offsets, offsets[1:]):
+            yield strings[start:end].decode("utf-8")
+
+
+class _DictionaryColumn:
+    """A dictionary-encoded column; each distinct string is decoded (and interned) once."""
+
+    def __init__(self, view, rows):
+        (count,) = COUNT.unpack_from(view)
+        strings_end = COUNT.size + (count + 1) * 8
+        offsets = _int_view(view[COUNT.size : strings_end], "Q")
+        strings_end += offsets[count]
+        self.values = [
+            sys.intern(value) for value in _StringColumn(view[COUNT.size :], count)
+        ]
+        start = strings_end + _padding(strings_end)
+        self.indices = _int_view(view[start : start + rows * 4], "I")
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        return self.values[self.indices[index]]
+
+    def __iter__(self):
+        values = self.values
+        return (values[index] for index in self.indices)
+
+
+def _release(values):
+    if isinstance(values, memoryview):
+        values.release()
+
+
+class Segment:
+    """A memory-mapped built-in segment; column() decodes nothing up front.
+
+    Columns are views of the mapped file: close() (or leaving a with block)
+    unmaps it, after which columns read from it can no longer be used.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = view = memoryview(self._mmap)
+        self._opened = []
+        magic, self.rows, column_count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an x-digest archive segment.")
+        self._columns = {}
+        position = HEADER.size
+        for _ in range(column_count):
+            (name_length,) = COLUMN_NAME_LENGTH.unpack_from(view, position)
+            position += COLUMN_NAME_LENGTH.size
+            name = str(view[position : position + name_length], "utf-8")
+            position += name_length
+            kind, length = COLUMN_INFO.unpack_from(view, position)
+            position += COLUMN_INFO.size
+            position += _padding(position)
+            self._columns[name] = (kind, view[position : position + length])
+            position += length
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def column(self, name):
+        """Returns a column as an indexable, iterable sequence."""
+        if name not in self._columns and name in OPTIONAL_COLUMNS:
+            return [OPTIONAL_COLUMNS[name]] * self.rows
+        kind, view = self._columns[name]
+        if kind == b"i":
+            column = _int_view(view, "q")
+        elif kind == b"d":
+            column = _DictionaryColumn(view, self.rows)
+        else:
+            column = _StringColumn(view, self.rows)
+        self._opened.append(column)
+        return column
+
+    def close(self):
+        """Releases every view of the file, then unmaps it."""
+        for column in self._opened:
+            if isinstance(column, _StringColumn):
+                _release(column.offsets)
+                _release(column.strings)
+            elif isinstance(column, _DictionaryColumn):
+                _release(column.indices)
+            else:
+                _release(column)
+        for _, view in self._columns.values():
+            view.release()
+        self._view.release()
+        self._mmap.close()
+
+
+@contextmanager
+def read_columns(path, names):
+    """Yields {name: sequence} for the given columns of a segment file.
+
+    Built-in segment columns are only valid inside the with block.
+    """
+    if path.endswith(SEGMENT_EXTENSIONS["parquet"]):
+        if not pyarrow:
+            raise RuntimeError(f"Reading {path} needs pyarrow.")
+        present = set(pyarrow.parquet.read_schema(path).names)
+        table = pyarrow.parquet.read_table(
+            path, columns=[name for name in names if name in present], memory_map=True
+        )
+        # Parquet dictionary-encodes repeated strings by itself
+        yield {
+            name: (
+                table.column(name).to_pylist()
+                if name in present
+                else [OPTIONAL_COLUMNS[name]] * table.num_rows
+            )
+            for name in names
+        }
+        return
+    with Segment(path) as segment:
+        yield {name: segment.column(name) for name in names}
+
+
+class Archive:
+    """A directory of per-run segments; "auto" format means Parquet if pyarrow is installed."""
+
+    def __init__(self, directory, format="auto"):
+        if format == "auto":
+            format = "parquet" if pyarrow else "segment"
+        if format not in SEGMENT_EXTENSIONS:
+            raise ValueError(f"Unknown archive format {format!r}.")
+        if format == "parquet" and not pyarrow:
+            raise ValueError("The parquet archive format needs pyarrow.")
+        self.directory = directory
+        self.format = format
+        os.makedirs(directory, exist_ok=True)
+
+    def segments(self):
+        """Segment paths, oldest run first."""
+        paths = []
+        for extension in SEGMENT_EXTENSIONS.values():
+            paths += glob.glob(os.path.join(self.directory, f"*{extension}"))
+        return sorted(paths, key=os.path.basename)
+
+    def append(self, run_id, tweets):
+        """Archives a run's tweet dicts as one segment (replacing that run's earlier
+        segment, if any); returns its path."""
+        tweets = [Tweet.from_record(tweet) for tweet in tweets if tweet.get("id")]
+        path = os.path.join(self.directory, run_id + SEGMENT_EXTENSIONS[self.format])
+        temp_path = path + ".tmp"
+        if self.format == "parquet":
+            table = pyarrow.Table.from_pydict(
+                {name: [getattr(tweet, name) for tweet in tweets] for name in COLUMNS},
+                schema=pyarrow.schema(
+                    [
+                        (name, pyarrow.int64() if kind == b"i" else pyarrow.string())
+                        for name, kind in COLUMNS.items()
+                    ]
+                ),
+            )
+            pyarrow.parquet.write_table(table, temp_path)
+        else:
+            write_segment(temp_path, tweets)
+        os.replace(temp_path, path)
+        for extension in SEGMENT_EXTENSIONS.values():
+            if not path.endswith(extension):
+                try:
+                    os.remove(os.path.join(self.directory, run_id + extension))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def columns(self, *names):
+        """Yields (run ID, {name: sequence}) for every segment, oldest first.
+
+        The sequences are only valid until the next segment is read.
+        """
+        for path in self.segments():
+            run_id = os.path.splitext(os.path.basename(path))[0]
+            with read_columns(path, names) as columns:
+                yield run_id, columns
+
+    def tweets(self):
+        """Yields every archived Tweet, oldest run first."""
+        for _, columns in self.columns(*COLUMNS):
+            rows = zip(*(columns[name] for name in COLUMNS))
+            for status_id, timestamp, handle, author, text, link, extra in rows:
+                if timestamp == NULL_TIMESTAMP:
+                    timestamp = None
+                yield Tweet(status_id, timestamp, handle, author, text, link, extra)
+
+
+def import_runs(archive, runs_dir):
+    """Archives runs/*/tweets.json checkpoints that have no segment yet."""
+    archived = {
+        os.path.splitext(os.path.basename(path))[0] for path in archive.segments()
+    }
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(runs_dir, "*", "tweets.json"))):
+        run_id = os.path.basename(os.path.dirname(path))
+        if run_id in archived:
+            continue
+        with open(path, encoding="utf-8") as f:
+            archive.append(run_id, json.load(f))
+        imported += 1
+    print(f"Imported {imported} runs from {runs_dir}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the tweet archive.")
+    parser.add_argument("--dir", default=os.getenv("ARCHIVE_DIR") or "archive")
+    parser.add_argument(
+        "--format",
+        default=os.getenv("ARCHIVE_FORMAT", "auto"),
+        help="auto, parquet or segment",
+    )
+    parser.add_argument(
+        "--import-runs",
+        metavar="RUNS_DIR",
+        help="archive the tweets.json checkpoints of earlier runs",
+    )
+    args = parser.parse_args()
+
+    archive = Archive(args.dir, args.format)
+    if args.import_runs:
+        import_runs(archive, args.import_runs)
+
+    total_rows = total_bytes = 0
+    start = time.perf_counter()
+    for path in archive.segments():
+        with read_columns(path, ["id"]) as columns:
+            rows = len(columns["id"])
+        size = os.path.getsize(path)
+        total_rows += rows
+        total_bytes += size
+        print(f"  {os.path.basename(path):32} {rows:>7} tweets {size / 1e3:>9.1f} kB")
+    tweets = sum(1 for _ in archive.tweets())
+    print(
+        f"{total_rows} tweets in {len(archive.segments())} segments "
+        f"({total_bytes / 1e6:.1f} MB); loaded all {tweets} in "
+        f"{time.perf_counter() - start:.2f}s."
+    )
@@ -0,0 +1,362 @@
+"""Offline benchmark of the parsing, digest and rendering path on recorded fixtures.
+
+Set RECORD_DIR when running a digest script to record fixtures: a gzipped
+page_source snapshot per scroll and every Gemini prompt/response, under
+RECORD_DIR/<run_id>/. Replaying them needs neither X nor a Gemini key:
+
+    python -m x_digest.bench recorded/20250101-080000
+    python -m x_digest.bench recorded/20250101-080000 --save-baseline
+    python -m x_digest.bench /tmp/synthetic --synthetic 30   # no recording at hand
+
+Parsing runs over every snapshot exactly as scrape_tweets does. Digest
+formatting replays the recorded Gemini response, or a stand-in digest built
+from the parsed tweets if none was recorded. Results are compared against
+bench_baseline.json in the fixture directory, and the exit status is 1 when a
+metric is worse than the baseline by more than --tolerance.
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from x_digest.dedupe import collapse_near_duplicates
+from x_digest.digest import (
+    StreamingDigestFormatter,
+    parse_digest,
+    render_digest_body,
+    render_email,
+)
+from x_digest.extract import parse_tweets_from_html, resolve_html_parser
+from x_digest.parse_workers import ParsedSnapshots, ParsePool
+from x_digest.prompts import build_digest_prompt, extract_final_digest
+from x_digest.ranking import classify_tweet
+
+BASELINE_FILE = "bench_baseline.json"
+FAST_STAGE_LOOPS = 50  # Calls per measurement of the prompt and formatting stages
+STREAM_CHUNK_CHARS = 200  # Roughly the size of a streamed Gemini chunk
+# Metric -> True if higher is better
+METRICS = {
+    "parse_tweets_per_sec": True,
+    "parse_mb_per_sec": True,
+    "parse_ms_per_snapshot": False,
+    "dedupe_ms": False,
+    "prompt_ms": False,
+    "stream_format_ms": False,
+    "render_ms": False,
+}
+
+
+class FixtureRecorder:
+    """Saves page_source snapshots and Gemini exchanges for later replay.
+
+    Safe to share between threads (concurrent accounts, parallel map calls).
+    """
+
+    def __init__(self, directory):
+        self.root = directory
+        self.directory = None
+        self._lock = threading.Lock()
+
+    def start_run(self, run_id):
+        """Records the following fixtures under <directory>/<run_id>/."""
+        self.directory = os.path.join(self.root, run_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self._snapshots = 0
+        self._llm_calls = 0
+        print(f"Recording benchmark fixtures to {self.directory}.")
+
+    def _next_path(self, name):
+        with self._lock:
+            # Outside a pipeline run, fall back to a timestamped directory
+            if self.directory is None:
+                self.start_run(time.strftime("%Y%m%d-%H%M%S"))
+            if name == "scroll":
+                path = f"scroll-{self._snapshots:03d}.html.gz"
+                self._snapshots += 1
+            else:
+                path = f"llm-{self._llm_calls:03d}-{name}.json"
+                self._llm_calls += 1
+            return os.path.join(self.directory, path)
+
+    def save_page_source(self, page_source):
+        """Saves one scroll's page_source."""
+        with gzip.open(self._next_path("scroll"), "wt", encoding="utf-8") as f:
+            f.write(page_source)
+
+    def save_llm_response(self, call, prompt, response_text):
+        """Saves one Gemini prompt and its response text."""
+        with open(self._next_path(call), "w", encoding="utf-8") as f:
+            json.dump(
+                {"call": call, "prompt": prompt, "response": response_text},
+                f,
+                ensure_ascii=False,
+            )
+
+
+def _load_snapshots(directory):
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(directory, "scroll-*.html.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshots.append(f.read())
+    return snapshots
+
+
+def _load_digest_response(directory):
+    """Returns the last recorded digest/reduce response, or None."""
+    responses = sorted(glob.glob(os.path.join(directory, "llm-*.json")))
+    for path in reversed(responses):
+        with open(path, encoding="utf-8") as f:
+            exchange = json.load(f)
+        if exchange["call"] in ("digest", "reduce"):
+            return exchange["response"]
+    return None
+
+
+def stand_in_digest(tweets, per_category=5):
+    """Builds a digest in Gemini's output format from the tweets themselves."""
+    sections = {}
+    for tweet in tweets:
+        category = classify_tweet(tweet["text"])[0] or "noteworthy"
+        sections.setdefault(category, []).append(tweet)
+    lines = []
+    for category, category_tweets in sections.items():
+        lines.append(f"### {category}")
+        for tweet in category_tweets[:per_category]:
+            handle = (tweet["handle"] or "@unknown").lstrip("@")
+            lines.append(
+                f"@{handle}: {tweet['text'][:160]} → "
+                f'<a href="{tweet["link"]}" class="tweet-link">view on X</a>'
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _best_of(repeat, func, loops=1):
+    """Times loops calls of func, repeat times; returns (fastest seconds per call,
+    last result). Sub-millisecond stages need loops > 1 to rise above timer noise.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            result = func()
+        elapsed = (time.perf_counter() - start) / loops
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def replay(directory, repeat=3, parser="auto", workers=0):
+    """Replays the fixtures in directory and returns the benchmark metrics.
+
+    With workers, snapshots are parsed in that many processes (as PARSE_WORKERS).
+    """
+    parser = resolve_html_parser(parser)
+    snapshots = _load_snapshots(directory)
+    if not snapshots:
+        raise SystemExit(f"No scroll-*.html.gz snapshots in {directory}.")
+
+    pool = ParsePool(workers, parser) if workers else None
+    if pool:
+        # Start the workers outside the timed runs
+        pool.submit(snapshots[0]).result()
+
+    def parse_snapshots():
+        if not pool:
+            for page_source in snapshots:
+                yield from parse_tweets_from_html(page_source, parser)
+            return
+        queued = ParsedSnapshots(pool)
+        for page_source in snapshots:
+            queued.submit(page_source)
+        yield from queued.ready(wait=True)
+
+    def parse_all():
+        # Same de-duplication by link as scrape_tweets
+        seen = set()
+        parsed = 0
+        tweets = []
+        for tweet in parse_snapshots():
+            parsed += 1
+            if tweet["link"] not in seen:
+                seen.add(tweet["link"])
+                tweets.append(tweet)
+        return parsed, tweets
+
+    parse_seconds, (parsed, tweets) = _best_of(repeat, parse_all)
+    if pool:
+        pool.close()
+    source_mb = sum(len(page_source) for page_source in snapshots) / 1e6
+    dedupe_seconds, candidates = _best_of(
+        repeat, lambda: collapse_near_duplicates(tweets, 0.6)
+    )
+    prompt_seconds, _ = _best_of(
+        repeat, lambda: build_digest_prompt(candidates), FAST_STAGE_LOOPS
+    )
+
+    response = _load_digest_response(directory) or stand_in_digest(candidates)
+    digest_text = extract_final_digest(response)
+
+    def stream_format():
+        formatter = StreamingDigestFormatter()
+        for i in range(0, len(response), STREAM_CHUNK_CHARS):
+            formatter.feed(response[i : i + STREAM_CHUNK_CHARS])
+        return formatter.finish()
+
+    stream_seconds, _ = _best_of(repeat, stream_format, FAST_STAGE_LOOPS)
+    render_seconds, _ = _best_of(
+        repeat,
+        lambda: render_email(
+            render_digest_body(parse_digest(digest_text)), "January 1, 2025"
+        ),
+        FAST_STAGE_LOOPS,
+    )
+
+    return {
+        "parser": parser,
+        "workers": workers,
+        "snapshots": len(snapshots),
+        "source_mb": round(source_mb, 2),
+        "tweets_parsed": parsed,
+        "unique_tweets": len(tweets),
+        "parse_tweets_per_sec": round(parsed / parse_seconds, 1),
+        "parse_mb_per_sec": round(source_mb / parse_seconds, 2),
+        "parse_ms_per_snapshot": round(parse_seconds * 1000 / len(snapshots), 2),
+        "dedupe_ms": round(dedupe_seconds * 1000, 2),
+        "prompt_ms": round(prompt_seconds * 1000, 3),
+        "stream_format_ms": round(stream_seconds * 1000, 3),
+        "render_ms": round(render_seconds * 1000, 3),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints each metric against the baseline; returns the regressed metric names."""
+    regressions = []
+    for name, higher_is_better in METRICS.items():
+        if name not in baseline or not baseline[name]:
+            print(f"  {name:24} {results[name]:>12}")
+            continue
+        change = (results[name] - baseline[name]) / baseline[name]
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(
+            f"  {name:24} {results[name]:>12}  (baseline {baseline[name]}, "
+            f"{change:+.0%}){flag}"
+        )
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def write_synthetic_fixtures(directory, snapshots, tweets_in_view=40, seed=1):
+    """Writes snapshots of a fake timeline that scrolls by ~60% of a view each time."""
+    rng = random.Random(seed)
+    words = (
+        "ai model launch market rates chip research paper startup funding election "
+        "policy space rocket gpu benchmark open source inflation earnings the a of "
+        "and to in is that for on with this new just big today week thread"
+    ).split()
+    # Markup X wraps around every tweet, which is most of the page's bulk
+    filler = (
+        '<div class="css-175oi2r r-18u37iz"><svg viewBox="0 0 24 24">'
+        + (
+            '<g><path d="M1.751 10c0-4.42 3.584-8 8.005-8h4.366c4.49 0 8.129 3.64 '
+            "8.129 8.13 0 2.96-1.607 5.68-4.196 7.11l-8.054 4.46v-3.69h-.067c-4.49.1-"
+            '8.183-3.51-8.183-8.01z"></path></g></svg><span class="css-1jxf684">12</span>'
+            "</div>"
+        )
+        * 6
+    )
+    os.makedirs(directory, exist_ok=True)
+    step = int(tweets_in_view * 0.6)
+    for index in range(snapshots):
+        articles = []
+        for n in range(index * step, index * step + tweets_in_view):
+            user = f"user{n % 97}"
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(12, 40)))
+            articles.append(
+                '<article data-testid="tweet"><div class="css-175oi2r">'
+                f'<div data-testid="User-Name"><span><span>User {n % 97}</span></span>'
+                f'<div dir="ltr"><span>@{user}</span></div>'
+                f'<a href="/{user}/status/{10**18 + n}">'
+                f'<time datetime="2025-01-01T{n % 24:02d}:00:00.000Z">1h</time></a></div>'
+                f'<div data-testid="tweetText"><span>{text}</span></div>'
+                f"{filler}</div></article>"
+            )
+        page = (
+            "<html><head><style>"
+            + "x" * 200_000
+            + '</style></head><body><div aria-label="Timeline: Your Home Timeline">'
+            + "".join(articles)
+            + "</div></body></html>"
+        )
+        path = os.path.join(directory, f"scroll-{index:03d}.html.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(page)
+    print(f"Wrote {snapshots} synthetic snapshots to {directory}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("fixtures", help="directory of recorded fixtures")
+    parser.add_argument(
+        "--parser", default="auto", help="HTML parser backend (as HTML_PARSER)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="parse in this many processes (as PARSE_WORKERS)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="fraction a metric may worsen before it counts as a regression",
+    )
+    parser.add_argument(
+        "--baseline", help=f"baseline file (default: <fixtures>/{BASELINE_FILE})"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store these results as baseline"
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        metavar="N",
+        help="first write N synthetic timeline snapshots into the fixture directory",
+    )
+    args = parser.parse_args()
+
+    if args.synthetic:
+        write_synthetic_fixtures(args.fixtures, args.synthetic)
+
+    results = replay(args.fixtures, args.repeat, args.parser, args.workers)
+    print(
+        f"Replayed {results['snapshots']} snapshots with {results['parser']} ({results['source_mb']} MB, "
+        f"{results['tweets_parsed']} tweets parsed, {results['unique_tweets']} unique):"
+    )
+
+    baseline_path = args.baseline or os.path.join(args.fixtures, BASELINE_FILE)
+    try:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+    if baseline.get("parser", results["parser"]) != results["parser"]:
+        print(f"Note: the baseline was measured with {baseline['parser']}.")
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {baseline_path}.")
+    elif regressions:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,160 @@
+"""Chrome setup helpers for running the scraper on shared hosts."""
+
+import json
+import os
+import shutil
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import SessionNotCreatedException
+from webdriver_manager.chrome import ChromeDriverManager
+
+DRIVER_CACHE_TTL = 7 * 24 * 3600  # Re-resolve the driver at least weekly
+CHROME_BINARY_CANDIDATES = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+LEAN_WINDOW_SIZE = "1024,900"
+LEAN_JS_HEAP_MB = 512  # V8 old-space cap for the page; X's timeline idles around 150MB
+
+# Media and fonts are never parsed by the scraper, so they are blocked at the
+# network layer. Avatars and emoji are tiny but numerous, so they go too.
+BLOCKED_URL_PATTERNS = [
+    "*video.twimg.com*",
+    "*pbs.twimg.com/media/*",
+    "*pbs.twimg.com/profile_images/*",
+    "*pbs.twimg.com/profile_banners/*",
+    "*pbs.twimg.com/card_img/*",
+    "*pbs.twimg.com/ext_tw_video_thumb/*",
+    "*pbs.twimg.com/amplify_video_thumb/*",
+    "*abs-0.twimg.com/emoji/*",
+    "*.mp4*",
+    "*.m3u8*",
+    "*.m4s*",
+    "*.woff*",
+    "*.ttf*",
+]
+
+
+def apply_lean_profile(options, headless=True):
+    """Adds the Chrome flags for a headless, media-free, memory-capped browser."""
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--mute-audio")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--renderer-process-limit=2")
+    options.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument(f"--js-flags=--max-old-space-size={LEAN_JS_HEAP_MB}")
+    options.add_experimental_option(
+        "prefs",
+        {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+        },
+    )
+
+
+def block_heavy_resources(driver):
+    """Blocks video, image and font requests through the CDP Network domain."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+
+
+def report_memory_usage(driver, cap_mb=LEAN_JS_HEAP_MB):
+    """Prints the page's JS heap usage against the configured cap; returns MB used."""
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        metrics = {
+            metric["name"]: metric["value"]
+            for metric in driver.execute_cdp_cmd("Performance.getMetrics", {})[
+                "metrics"
+            ]
+        }
+    except Exception as e:
+        print(f"Could not read browser memory metrics: {e}")
+        return None
+
+    used_mb = metrics.get("JSHeapUsedSize", 0) / (1024 * 1024)
+    total_mb = metrics.get("JSHeapTotalSize", 0) / (1024 * 1024)
+    print(
+        f"Browser JS heap: {used_mb:.0f}MB used, {total_mb:.0f}MB allocated, "
+        f"{cap_mb}MB cap, {metrics.get('Nodes', 0):.0f} DOM nodes."
+    )
+    if used_mb > 0.8 * cap_mb:
+        print("Warning: JS heap is close to the cap; consider fewer scrolls per run.")
+    return used_mb
+
+
+# --- ChromeDriver provisioning ---
+
+
+def _chrome_fingerprint():
+    """Identifies the installed Chrome by binary path and mtime (changes on update)."""
+    for candidate in CHROME_BINARY_CANDIDATES:
+        binary = shutil.which(candidate) or (
+            candidate if os.path.isfile(candidate) else None
+        )
+        if binary:
+            binary = os.path.realpath(binary)
+            return f"{binary}:{os.path.getmtime(binary):.0f}"
+    return None
+
+
+def resolve_driver_path(cache_file):
+    """Returns the chromedriver path, only running ChromeDriverManager when the cache is stale.
+
+    The cache is stale when it is older than DRIVER_CACHE_TTL, the cached driver
+    is gone, or the Chrome binary changed since the driver was resolved.
+    """
+    fingerprint = _chrome_fingerprint()
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if (
+            time.time() - cached["resolved_at"] < DRIVER_CACHE_TTL
+            and os.path.exists(cached["path"])
+            and cached["chrome"] == fingerprint
+        ):
+            return cached["path"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    print("Resolving ChromeDriver version...")
+    path = ChromeDriverManager().install()
+    with open(cache_file, "w") as f:
+        json.dump({"path": path, "chrome": fingerprint, "resolved_at": time.time()}, f)
+    return path
+
+
+def start_chrome(options, cache_file):
+    """Starts Chrome with the cached driver, re-resolving once if versions no longer match."""
+    try:
+        return webdriver.Chrome(
+            service=Service(resolve_driver_path(cache_file)), options=options
+        )
+    except SessionNotCreatedException as e:
+        # Usually "This version of ChromeDriver only supports Chrome version N"
+        print(f"Cached ChromeDriver rejected by Chrome ({e.msg}), re-resolving...")
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        return webdriver.Chrome(
+            service=Service(resolve_driver_path(cache_file)), options=options
+        )
+
+
+def attach_driver(debugger_address, cache_file, capture_network=False):
+    """Returns a driver attached to an already-running Chrome (see x_digest.daemon)."""
+    options = webdriver.ChromeOptions()
+    options.add_experimental_option("debuggerAddress", debugger_address)
+    if capture_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return start_chrome(options, cache_file)
@@ -0,0 +1,229 @@
+"""Warm browser daemon: keeps one logged-in Chrome alive for successive digest runs.
+
+The daemon launches Chrome with a remote debugging port and serves a tiny JSON
+line protocol on a localhost control socket. A digest run sends "acquire", gets
+the debugger address back, attaches its own driver to the running browser and
+holds the lease until it sends "release" or disconnects. Only one run holds the
+browser at a time; other runs wait for the lease.
+
+The browser is logged in to X, so the daemon writes a random token and its
+randomly chosen debugging port to a file only the current user can read (like
+SESSION_FILE), and every control request must carry that token.
+"""
+
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+
+DAEMON_HOST = "127.0.0.1"
+ACQUIRE_TIMEOUT = 600  # Seconds a run waits for the browser before giving up
+
+
+def _free_port():
+    """Returns a currently unused localhost port chosen by the OS."""
+    with socket.socket() as sock:
+        sock.bind((DAEMON_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _write_daemon_file(path, state):
+    """Writes the daemon's token and ports, readable only by the current user."""
+    temp_path = f"{path}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+
+def read_daemon_token(path):
+    """Returns the running daemon's token, or None if there is no daemon file."""
+    try:
+        with open(path) as f:
+            return json.load(f)["token"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class BrowserLease:
+    """A held lease on the daemon's browser; release it (or exit) to free the browser."""
+
+    def __init__(self, sock, debugger_address, token):
+        self.sock = sock
+        self.debugger_address = debugger_address
+        self.token = token
+
+    def release(self):
+        """Gives the browser back to the daemon."""
+        try:
+            command = {"cmd": "release", "token": self.token}
+            self.sock.sendall((json.dumps(command) + "\n").encode())
+        except OSError:
+            pass
+        finally:
+            self.sock.close()
+
+
+def _request(sock_file, sock, command, token):
+    """Sends one JSON command with the daemon token and returns the JSON reply."""
+    sock.sendall((json.dumps(dict(command, token=token)) + "\n").encode())
+    line = sock_file.readline()
+    if not line:
+        raise ConnectionError("browser daemon closed the connection")
+    return json.loads(line)
+
+
+def acquire_warm_browser(port, daemon_file):
+    """Leases the daemon's browser; returns a BrowserLease, or None if no daemon is running."""
+    token = read_daemon_token(daemon_file)
+    if not token:
+        return None
+    try:
+        sock = socket.create_connection((DAEMON_HOST, port), timeout=2)
+    except OSError:
+        return None
+
+    sock.settimeout(ACQUIRE_TIMEOUT)
+    print("Waiting for the warm browser from the daemon...")
+    try:
+        reply = _request(sock.makefile("r"), sock, {"cmd": "acquire"}, token)
+    except (OSError, ValueError) as e:
+        print(f"Browser daemon did not respond: {e}")
+        sock.close()
+        return None
+    if not reply.get("ok"):
+        print(f"Browser daemon refused the lease: {reply.get('error')}")
+        sock.close()
+        return None
+    return BrowserLease(sock, reply["debugger_address"], token)
+
+
+def send_daemon_command(port, cmd, daemon_file):
+    """Sends a one-off command ("status" or "shutdown") and returns the reply."""
+    token = read_daemon_token(daemon_file)
+    if not token:
+        raise ConnectionError(f"no browser daemon token in {daemon_file}")
+    with socket.create_connection((DAEMON_HOST, port), timeout=5) as sock:
+        return _request(sock.makefile("r"), sock, {"cmd": cmd}, token)
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection; the lease is tied to the connection's lifetime."""
+
+    def handle(self):
+        daemon = self.server.daemon
+        holding = False
+        try:
+            for line in self.rfile:
+                request = json.loads(line)
+                if not hmac.compare_digest(str(request.get("token", "")), daemon.token):
+                    reply = {"ok": False, "error": "invalid daemon token"}
+                    self.wfile.write((json.dumps(reply) + "\n").encode())
+                    return
+                command = request.get("cmd")
+                if command == "acquire" and not holding:
+                    daemon.lock.acquire()
+                    holding = True
+                    reply = daemon.prepare()
+                    if reply.get("ok"):
+                        daemon.runs += 1
+                        print(f"Lending warm browser to digest run #{daemon.runs}.")
+                    else:
+                        daemon.lock.release()
+                        holding = False
+                elif command == "release" and holding:
+                    daemon.lock.release()
+                    holding = False
+                    reply = {"ok": True}
+                elif command == "status":
+                    reply = {
+                        "ok": True,
+                        "busy": daemon.lock.locked(),
+                        "runs": daemon.runs,
+                    }
+                elif command == "shutdown":
+                    reply = {"ok": True}
+                    threading.Thread(target=self.server.shutdown).start()
+                else:
+                    reply = {"ok": False, "error": f"unexpected command {command!r}"}
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+        finally:
+            if holding:
+                # Client crashed or disconnected without releasing
+                daemon.lock.release()
+
+
+class _ControlServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class BrowserDaemon:
+    """Owns the warm browser and hands it out to digest runs one at a time.
+
+    create_driver(debug_port) must launch Chrome with
+    --remote-debugging-port=debug_port. ensure_ready(driver) is called before
+    every lease to make sure the browser is logged in and on a fresh home
+    timeline; it returns False on failure. daemon_file receives the control
+    token and the ports while the daemon runs.
+    """
+
+    def __init__(self, create_driver, ensure_ready, daemon_file):
+        self.create_driver = create_driver
+        self.ensure_ready = ensure_ready
+        self.daemon_file = daemon_file
+        self.debug_port = _free_port()
+        self.token = secrets.token_urlsafe(32)
+        self.lock = threading.Lock()
+        self.driver = None
+        self.runs = 0
+
+    def prepare(self):
+        """Readies the browser for a lease (restarting it if it died)."""
+        try:
+            if self.driver:
+                self.driver.title  # Raises if Chrome went away
+        except Exception:
+            print("Warm browser is gone, restarting it...")
+            self.driver = None
+        try:
+            if not self.driver:
+                self.driver = self.create_driver(self.debug_port)
+            if not self.ensure_ready(self.driver):
+                return {"ok": False, "error": "browser is not logged in"}
+        except Exception as e:
+            print(f"Error preparing the warm browser: {e}")
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "debugger_address": f"{DAEMON_HOST}:{self.debug_port}"}
+
+    def serve(self, port):
+        """Starts the browser and serves leases until shutdown or Ctrl+C."""
+        with self.lock:
+            reply = self.prepare()
+            if not reply.get("ok"):
+                print(f"Could not start the warm browser: {reply.get('error')}")
+                return
+
+        server = _ControlServer((DAEMON_HOST, port), _ControlHandler)
+        server.daemon = self
+        _write_daemon_file(
+            self.daemon_file,
+            {"token": self.token, "port": port, "debug_port": self.debug_port},
+        )
+        print(
+            f"Browser daemon listening on {DAEMON_HOST}:{port}. Press Ctrl+C to stop."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if read_daemon_token(self.daemon_file) == self.token:
+                os.remove(self.daemon_file)
+            if self.driver:
+                print("Closing warm browser...")
+                self.driver.quit()
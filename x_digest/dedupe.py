@@ -0,0 +1,136 @@
+"""Near-duplicate detection so one story posted by many accounts is summarized once.
+
+Each tweet becomes a set of word shingles and a MinHash signature of
+NUM_HASHES values. Signatures are cut into bands; tweets sharing any whole
+band become candidate pairs (locality-sensitive hashing), and only those pairs
+are checked for exact Jaccard similarity, skipping bucket members already in
+the same cluster. Clustering therefore stays close to linear in the number of
+tweets, even when one story is posted many times.
+"""
+
+import hashlib
+import re
+import struct
+
+SHINGLE_SIZE = 3  # Words per shingle
+NUM_HASHES = 32  # One 64-byte BLAKE2b digest yields 32 16-bit MinHash values
+BANDS = 8  # 8 bands of 4 rows: pairs above ~0.6 similarity almost always collide
+ROWS_PER_BAND = NUM_HASHES // BANDS
+URL_PATTERN = re.compile(r"https?://\S+")
+MENTION_PATTERN = re.compile(r"@\w+")
+WORD_PATTERN = re.compile(r"\w+")
+DIGEST_FORMAT = struct.Struct(f">{NUM_HASHES}H")
+
+
+def shingles(text):
+    """Returns the set of word shingles of a tweet, ignoring links, mentions and case.
+
+    Tweets with no words left (only links, mentions or emoji) have no shingles.
+    """
+    text = MENTION_PATTERN.sub(" ", URL_PATTERN.sub(" ", text.lower()))
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return set()
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(shingle_set):
+    """Returns the MinHash signature of a shingle set as a tuple of NUM_HASHES ints."""
+    rows = [
+        DIGEST_FORMAT.unpack(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=64).digest()
+        )
+        for shingle in shingle_set
+    ]
+    # Column-wise minimum, computed in C by zip/min
+    return tuple(map(min, zip(*rows)))
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def cluster_tweets(tweets, threshold):
+    """Groups tweets whose shingle sets have Jaccard similarity >= threshold.
+
+    Returns clusters as lists of tweet indices, ordered by first appearance.
+    Tweets without shingles have nothing to compare and stay on their own.
+    """
+    shingle_sets = [shingles(tweet["text"]) for tweet in tweets]
+    parent = list(range(len(tweets)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for i, shingle_set in enumerate(shingle_sets):
+        if not shingle_set:
+            continue
+        signature = minhash(shingle_set)
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND])
+            # A bucket's members are grouped by cluster, and a group the tweet
+            # has already joined is skipped whole, so a story posted thousands
+            # of times costs a few comparisons per tweet instead of one per copy
+            groups = buckets.setdefault(key, [])
+            joined = None
+            for group in groups:
+                if find(group[0]) == find(i):
+                    joined = joined or group
+                    continue
+                for j in group:
+                    if _jaccard(shingle_set, shingle_sets[j]) >= threshold:
+                        parent[find(i)] = find(j)
+                        joined = joined or group
+                        break
+            if joined:
+                joined.append(i)
+            else:
+                groups.append([i])
+
+    clusters = {}
+    for i in range(len(tweets)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def _representative(tweets, members):
+    """Picks the member with the most engagement, falling back to the longest text."""
+    return max(
+        members,
+        key=lambda i: (
+            sum((tweets[i].get("metrics") or {}).values()),
+            len(tweets[i]["text"]),
+            -i,
+        ),
+    )
+
+
+def collapse_near_duplicates(tweets, threshold):
+    """Returns one representative tweet per near-duplicate cluster, in timeline order.
+
+    Representatives carry `cluster_size`, which the pre-ranking uses as a signal
+    that many accounts are talking about the same thing. A threshold of 0
+    disables clustering.
+    """
+    if threshold <= 0 or len(tweets) < 2:
+        return tweets
+
+    representatives = []
+    for members in cluster_tweets(tweets, threshold):
+        tweet = dict(tweets[_representative(tweets, members)])
+        tweet["cluster_size"] = len(members)
+        representatives.append(tweet)
+
+    collapsed = len(tweets) - len(representatives)
+    if collapsed:
+        print(f"Collapsed {collapsed} near-duplicate tweets into their stories.")
+    return representatives
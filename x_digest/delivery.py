@@ -0,0 +1,176 @@
+"""Fan-out of one digest to many recipients through Resend batch sends.
+
+Each recipient can ask for a subset of the digest's categories. Variants are
+rendered once per distinct preference, packed into Resend batches (up to
+BATCH_SIZE emails per request) and sent a few batches at a time. Every batch
+carries an idempotency key derived from its recipients and the run that
+produced the digest, so a retried or resumed send does not deliver the same
+digest twice while the next run's digest still goes out.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from x_digest.digest import Digest
+from x_digest.retry import call_with_retries
+
+BATCH_SIZE = 100  # Resend's limit for one batch request
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1  # Seconds; doubled on every retry
+
+# categories is None for the full digest, otherwise title keywords to keep
+Recipient = namedtuple("Recipient", "email categories")
+
+
+def load_recipients(path):
+    """Loads recipients from a JSON list; a missing file means no recipients.
+
+    Entries are either an address or {"email": ..., "categories": [...]},
+    where categories are case-insensitive keywords matched against headers.
+    """
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return []
+
+    recipients = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"email": entry}
+        categories = entry.get("categories")
+        if categories is not None:
+            categories = tuple(sorted(keyword.lower() for keyword in categories))
+        recipients.append(Recipient(entry["email"].strip(), categories))
+    return recipients
+
+
+def select_categories(digest, categories):
+    """Returns the digest with only the categories matching any keyword."""
+    if categories is None:
+        return digest
+    return Digest(
+        digest.intro,
+        [
+            category
+            for category in digest.categories
+            if category.title is not None
+            and any(keyword in category.title.lower() for keyword in categories)
+        ],
+    )
+
+
+def idempotency_key(email, digest_id):
+    """Key identifying one recipient's copy of one digest (one pipeline run)."""
+    return f"x-digest/{digest_id}/{email.lower()}"
+
+
+def build_messages(
+    digest, recipients, sender, subject, digest_id, render, full_html=None
+):
+    """Renders each recipient's variant; returns messages of Resend params, key
+    and digest_id.
+
+    digest_id names the digest (its run) in the idempotency keys. render(digest)
+    returns the email HTML. full_html, if given, is reused for
+    recipients of the whole digest. Recipients whose categories match nothing
+    in today's digest are skipped.
+    """
+    variants = {None: full_html} if full_html is not None else {}
+    messages = []
+    for recipient in recipients:
+        if recipient.categories not in variants:
+            selected = select_categories(digest, recipient.categories)
+            variants[recipient.categories] = (
+                render(selected) if selected.categories else None
+            )
+        html = variants[recipient.categories]
+        if html is None:
+            print(f"Nothing in today's digest for {recipient.email}, skipping.")
+            continue
+        messages.append(
+            {
+                "key": idempotency_key(recipient.email, digest_id),
+                "digest": digest_id,
+                "params": {
+                    "from": sender,
+                    "to": [recipient.email],
+                    "subject": subject,
+                    "html": html,
+                },
+            }
+        )
+    rendered = sum(html is not None for html in variants.values())
+    print(f"Rendered {rendered} digest variants for {len(messages)} recipients.")
+    return messages
+
+
+def batch_key(messages):
+    """Idempotency key for a batch, derived from its recipients' keys.
+
+    Messages retried from a failed batch keep that batch's key.
+    """
+    keys = {message.get("batch_key") for message in messages}
+    if len(keys) == 1 and None not in keys:
+        return keys.pop()
+    keys = "\n".join(sorted(message["key"] for message in messages))
+    return "x-digest/batch/" + hashlib.sha256(keys.encode("utf-8")).hexdigest()
+
+
+def send_with_retries(send_batch, messages):
+    """Sends one batch, retrying rate limits and transient server errors."""
+    params = [message["params"] for message in messages]
+    key = batch_key(messages)
+    return call_with_retries(
+        lambda: send_batch(params, key), "Resend", MAX_RETRIES, RETRY_BASE_DELAY
+    )
+
+
+def _batches(messages, batch_size):
+    """Splits messages into batches, regrouping retried ones as first sent."""
+    retried = {}
+    fresh = []
+    for message in messages:
+        if message.get("batch_key"):
+            retried.setdefault(message["batch_key"], []).append(message)
+        else:
+            fresh.append(message)
+    return list(retried.values()) + [
+        fresh[i : i + batch_size] for i in range(0, len(fresh), batch_size)
+    ]
+
+
+def deliver_messages(
+    messages, send_batch, concurrency, batch_size=BATCH_SIZE, on_failure=None
+):
+    """Sends messages in batches, concurrency batches at a time.
+
+    send_batch(params_list, idempotency_key) performs one batch request.
+    Returns the messages that were delivered; failed batches are reported,
+    passed to on_failure(batch, error) and left out.
+    """
+    batches = _batches(messages, batch_size)
+    print(
+        f"Sending {len(messages)} emails in {len(batches)} batches "
+        f"({concurrency} at a time)..."
+    )
+
+    def send(batch):
+        try:
+            send_with_retries(send_batch, batch)
+            return batch
+        except Exception as e:
+            recipients = ", ".join(message["params"]["to"][0] for message in batch)
+            print(f"Batch to {recipients} failed: {e}")
+            if on_failure:
+                on_failure(batch, e)
+            return []
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        delivered = [
+            message for sent in executor.map(send, batches) for message in sent
+        ]
+    print(f"Delivered {len(delivered)} of {len(messages)} emails.")
+    return delivered
@@ -0,0 +1,352 @@
+"""Typed digest model, its single-pass parser and the HTML renderers.
+
+Gemini writes the digest as "### category" headers followed by
+"@handle: summary → <a href=...>view on X</a>" lines. parse_digest turns that
+text into a Digest of categories and items in one pass over its lines, and the
+render functions build HTML from the model with precompiled templates, so
+other renderers (per-recipient variants, plain text) can reuse the structure.
+StreamingDigestFormatter runs the same parser line by line while Gemini is
+still generating and renders exactly what render_digest_body would.
+"""
+
+import re
+import time
+from collections import namedtuple
+
+from x_digest.prompts import extract_final_digest
+
+HEADER_PATTERN = re.compile(r"^\s*###\s+(.*?)\s*$")
+ITEM_PATTERN = re.compile(r"@([a-zA-Z0-9_]+):")
+# The trailing "<a href=...>view on X</a>" of an item line, matched from its "<a"
+LINK_PATTERN = re.compile(r"<a\s[^>]*href=[\"']([^\"']*)[\"'][^>]*>([^<]*)</a>\s*$")
+FINAL_DIGEST_TAG = "<final_digest>"
+
+# title is None for items that appear before any header
+Category = namedtuple("Category", "title items notes")
+DigestItem = namedtuple("DigestItem", "handle summary link link_text")
+# A stray text line in a category; position is how many items precede it
+Note = namedtuple("Note", "position text")
+Digest = namedtuple("Digest", "intro categories")
+
+_render_header = '<div class="category-header">{}</div>'.format
+_render_link = ' → <a href="{}" class="tweet-link">{}</a>'.format
+_render_item = (
+    '<li class=\'tweet-item\'><a href="https://x.com/{0}" target="_blank" '
+    'class="handle-link">@{0}</a>: {1}{2}</li>'
+).format
+LIST_OPEN = "<ol class='tweet-list'>"
+LIST_CLOSE = "</ol>"
+
+EMAIL_TEMPLATE = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>The X Digest</title>
+        <style>
+            body {{
+                font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+            }}
+            .container {{
+                max-width: 700px;
+                margin: 20px auto;
+                padding: 20px;
+                border: 1px solid #ddd;
+                border-radius: 5px;
+                background-color: #fff;
+            }}
+            h1 {{
+                color: #1DA1F2; /* Twitter blue */
+                font-size: 24px;
+                margin-bottom: 16px;
+            }}
+            .category-header {{
+                color: #000000;
+                font-size: 16px;
+                font-weight: 500;
+                margin: 24px 0 12px 0;
+                padding-bottom: 4px;
+            }}
+            .tweet-list {{
+                list-style-type: disc;
+                padding-left: 20px;
+                margin: 15px 0;
+                border-left: 2px solid #eee;
+                background-color: #fdfdfd;
+                border-radius: 4px;
+                padding-top: 10px;
+                padding-bottom: 1px;
+            }}
+            .tweet-item {{
+                margin-bottom: 15px;
+                padding-left: 3px;
+                font-size: 14px;
+                line-height: 1.5;
+            }}
+            a {{
+                color: #1DA1F2;
+                text-decoration: none;
+            }}
+            a:hover {{
+                text-decoration: underline;
+            }}
+            .handle-link {{ /* Style for the handle link */
+                /* font-weight: bold; */ /* Optionally make handle bold */
+                 color: #14171A; /* Darker color for handle */
+            }}
+            .tweet-link {{ /* Style for the 'view on X' link */
+                font-size: 0.9em;
+                /* margin-left: 5px; */ /* Add space before the link */
+            }}
+            .intro-text {{
+                font-size: 14px;
+                color: #333;
+                margin: 16px 0;
+            }}
+             hr {{
+                border: none;
+                border-top: 1px solid #eee;
+                margin: 20px 0;
+             }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>The X Digest — {current_date}</h1>
+            <p class="intro-text">Here's your daily dose of what's happening, curated from your timeline. Buckle up!</p>
+            <hr>
+            {formatted_content}
+            <hr>
+            <p style="font-size: 0.8em; color: #777;">
+                Generated by X Digest Bot. Remember that scraping can be unreliable.
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def parse_digest_line(line):
+    """Classifies one digest line as ("header", title), ("item", DigestItem),
+    ("text", line) or (None, None) for blank lines."""
+    # Cheap prefix checks first; most lines need only one regex match
+    if line.startswith("@"):
+        item = ITEM_PATTERN.match(line)
+        if item:
+            return "item", _parse_item(item.group(1), line[item.end() :].strip())
+    elif "###" in line:
+        header = HEADER_PATTERN.match(line)
+        if header:
+            return "header", header.group(1)
+    if line.strip():
+        return "text", line.strip()
+    return None, None
+
+
+def _parse_item(handle, rest):
+    """Splits an item's text into its summary and trailing "→ view on X" link."""
+    start = rest.rfind("<a")
+    link = LINK_PATTERN.match(rest, start) if start >= 0 else None
+    if not link:
+        return DigestItem(handle, rest, None, None)
+    summary = rest[:start].rstrip()
+    for arrow in ("→", "->"):
+        if summary.endswith(arrow):
+            summary = summary[: -len(arrow)].rstrip()
+            break
+    return DigestItem(handle, summary, link.group(1), link.group(2))
+
+
+class DigestBuilder:
+    """Accumulates parsed digest lines into a Digest."""
+
+    def __init__(self):
+        self.digest = Digest([], [])
+
+    def add_line(self, line):
+        """Parses a line into the digest and returns its (kind, value)."""
+        kind, value = parse_digest_line(line)
+        categories = self.digest.categories
+        if kind == "header":
+            categories.append(Category(value, [], []))
+        elif kind == "item":
+            if not categories:
+                categories.append(Category(None, [], []))
+            categories[-1].items.append(value)
+        elif kind == "text":
+            if categories:
+                category = categories[-1]
+                category.notes.append(Note(len(category.items), value))
+            else:
+                self.digest.intro.append(value)
+        return kind, value
+
+
+def parse_digest(text):
+    """Parses digest text (anything before <final_digest> is dropped) into a Digest."""
+    builder = DigestBuilder()
+    for line in extract_final_digest(text).split("\n"):
+        builder.add_line(line)
+    return builder.digest
+
+
+def render_item(item):
+    """Renders one digest item as a list entry with a linked handle."""
+    link = _render_link(item.link, item.link_text) if item.link is not None else ""
+    return _render_item(item.handle, item.summary, link)
+
+
+def _render_category(category):
+    """Fragments of one category: its header, then its items in ordered lists,
+    with any notes in their original place between them."""
+    fragments = []
+    if category.title is not None:
+        fragments.append(_render_header(category.title))
+    notes = iter(category.notes)
+    note = next(notes, None)
+    in_list = False
+    for position, item in enumerate(category.items):
+        while note is not None and note.position == position:
+            if in_list:
+                fragments.append(LIST_CLOSE)
+                in_list = False
+            fragments.append(note.text)
+            note = next(notes, None)
+        if not in_list:
+            fragments.append(LIST_OPEN)
+            in_list = True
+        fragments.append(render_item(item))
+    if in_list:
+        fragments.append(LIST_CLOSE)
+    while note is not None:
+        fragments.append(note.text)
+        note = next(notes, None)
+    return fragments
+
+
+def render_digest_body(digest):
+    """Renders the digest model as the HTML fragment placed inside the email."""
+    fragments = list(digest.intro)
+    for category in digest.categories:
+        fragments.extend(_render_category(category))
+    return "\n".join(fragments)
+
+
+def render_email(formatted_content, current_date):
+    """Wraps rendered digest HTML in the full email document."""
+    return EMAIL_TEMPLATE.format(
+        current_date=current_date, formatted_content=formatted_content
+    )
+
+
+class StreamingDigestFormatter:
+    """Parses and renders digest text line by line as chunks arrive.
+
+    Headers, items and notes are rendered as soon as their line is complete,
+    and the HTML matches render_digest_body(parse_digest(text)). Lines before
+    the first header are held back until it is clear whether a <final_digest>
+    tag follows (everything before the tag is dropped).
+    """
+
+    def __init__(self, on_line=None):
+        self.on_line = on_line  # Called with (kind, text, seconds since start)
+        self.started_at = time.monotonic()
+        self.first_chunk_at = None
+        self.first_line_at = None
+        self.lines = 0
+        self._builder = DigestBuilder()
+        self.digest = self._builder.digest
+        self._text = []
+        self._partial = ""
+        self._pending = []  # Lines seen before the first header
+        self._seen_header = False
+        self._in_list = False
+        self._html = []
+
+    def feed(self, chunk):
+        """Consumes a chunk of streamed text and renders every completed line."""
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.monotonic()
+        self._text.append(chunk)
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+
+    def finish(self):
+        """Renders the final unterminated line and closes the last category."""
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+        self._flush_pending()
+        self._close_list()
+        return self.html()
+
+    def text(self):
+        """Returns all streamed text so far."""
+        return "".join(self._text)
+
+    def html(self):
+        """Returns the HTML rendered so far."""
+        return "\n".join(self._html)
+
+    def timings(self):
+        """Returns time to first chunk and first digest line, in seconds."""
+        return {
+            "first_chunk": (
+                self.first_chunk_at - self.started_at if self.first_chunk_at else None
+            ),
+            "first_line": (
+                self.first_line_at - self.started_at if self.first_line_at else None
+            ),
+        }
+
+    def _line(self, line):
+        if not self._seen_header:
+            if FINAL_DIGEST_TAG in line:
+                # Anything before the tag is preamble, not digest
+                self._pending = []
+                line = line.split(FINAL_DIGEST_TAG, 1)[1]
+            if not HEADER_PATTERN.match(line):
+                self._pending.append(line)
+                return
+            self._seen_header = True
+            self._flush_pending()
+        self._render_line(line)
+
+    def _flush_pending(self):
+        pending, self._pending = self._pending, []
+        for line in pending:
+            self._render_line(line)
+
+    def _render_line(self, line):
+        kind, value = self._builder.add_line(line)
+        if kind == "header":
+            self._close_list()
+            self._html.append(_render_header(value))
+            self._report("header", value)
+        elif kind == "item":
+            if not self._in_list:
+                self._html.append(LIST_OPEN)
+                self._in_list = True
+            self._html.append(render_item(value))
+            self._report("item", f"@{value.handle}")
+        elif kind == "text":
+            self._close_list()
+            self._html.append(value)
+
+    def _close_list(self):
+        if self._in_list:
+            self._html.append(LIST_CLOSE)
+            self._in_list = False
+
+    def _report(self, kind, text):
+        now = time.monotonic()
+        if self.first_line_at is None:
+            self.first_line_at = now
+        self.lines += 1
+        if self.on_line:
+            self.on_line(kind, text, now - self.started_at)
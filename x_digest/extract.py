@@ -0,0 +1,431 @@
+"""Tweet extraction from the X home timeline."""
+
+import json
+import re
+
+from bs4 import BeautifulSoup
+
+# Optional faster parsers for page_source snapshots
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+TWEET_SELECTOR = 'article[data-testid="tweet"]'  # Main selector for tweet elements
+TIMELINE_SELECTOR = 'div[aria-label*="Timeline"]'
+OBSERVER_BATCH_SIZE = 100  # Tweets pulled from the in-page buffer per drain call
+STATUS_ID_PATTERN = re.compile(r"/status/(\d+)")
+if lxml:
+    # First-match lookups inside User-Name, as in the CSS selectors
+    _LXML_NAME_SPANS = lxml.etree.XPath(".//span//span")
+    _LXML_HANDLE_SPANS = lxml.etree.XPath('.//div[@dir="ltr"]//span')
+
+
+def status_id_from_link(link):
+    """Returns the numeric status ID from a tweet permalink, or None."""
+    match = STATUS_ID_PATTERN.search(link or "")
+    return match.group(1) if match else None
+
+
+def make_tweet_record(author, handle, text, link, tweeted_at=None):
+    """Builds the tweet dict passed between the scraping, LLM and email stages."""
+    return {
+        "id": status_id_from_link(link),
+        "author": author or "Unknown Author",
+        "handle": handle or "",
+        "text": text,
+        "link": link,
+        "time": tweeted_at,
+    }
+
+
+def _joined_text(strings, separator=""):
+    """Strips each string and joins the non-empty ones, like get_text(strip=True)."""
+    return separator.join(
+        text for text in (string.strip() for string in strings) if text
+    )
+
+
+def _build_record(tweet_text, author, handle, href, tweeted_at):
+    """Applies the link rules shared by every parser backend; None if incomplete."""
+    # Basic check if it looks like a status link
+    if not tweet_text or not href or "/status/" not in href:
+        return None
+    return make_tweet_record(
+        author, handle, tweet_text, f"https://x.com{href}", tweeted_at
+    )
+
+
+def _parse_with_beautifulsoup(page_source):
+    soup = BeautifulSoup(page_source, "html.parser")
+    tweets = []
+
+    for article in soup.select(TWEET_SELECTOR):
+        tweet_text_element = article.select_one('div[data-testid="tweetText"]')
+        user_name_element = article.select_one('div[data-testid="User-Name"]')
+        time_element = article.select_one("time[datetime]")  # Find the time element
+        permalink_element = (
+            time_element.find_parent("a") if time_element else None
+        )  # Find its parent link
+
+        tweet_text = (
+            tweet_text_element.get_text(strip=True) if tweet_text_element else None
+        )
+
+        author = None
+        handle = None
+        if user_name_element:
+            # Try to extract cleanly
+            name_span = user_name_element.select_one(
+                "span span"
+            )  # Often nested spans for name
+            handle_span = user_name_element.select_one(
+                'div[dir="ltr"] span'
+            )  # Look for the @handle specifically
+
+            if name_span:
+                author = name_span.get_text(strip=True)
+            if handle_span and handle_span.get_text(strip=True).startswith("@"):
+                handle = handle_span.get_text(strip=True)
+            # Fallback if specific spans not found
+            if not author and not handle:
+                author = user_name_element.get_text(
+                    separator=" ", strip=True
+                )  # Less precise fallback
+
+        href = None
+        if permalink_element and permalink_element.has_attr("href"):
+            href = permalink_element["href"]
+
+        record = _build_record(
+            tweet_text,
+            author,
+            handle,
+            href,
+            time_element["datetime"] if time_element else None,
+        )
+        if record:
+            tweets.append(record)
+
+    return tweets
+
+
+def _selectolax_text(node, separator=""):
+    return _joined_text(
+        (
+            child.text_content
+            for child in node.traverse(include_text=True)
+            if child.is_text_node
+        ),
+        separator,
+    )
+
+
+def _parse_with_selectolax(page_source):
+    tweets = []
+    for article in LexborHTMLParser(page_source).css(TWEET_SELECTOR):
+        # One walk over the article finds the first of each field element
+        text_node = user_name_node = time_node = None
+        for node in article.traverse():
+            if node.tag == "div":
+                if text_node is None or user_name_node is None:
+                    test_id = node.attributes.get("data-testid")
+                    if test_id == "tweetText" and text_node is None:
+                        text_node = node
+                    elif test_id == "User-Name" and user_name_node is None:
+                        user_name_node = node
+            elif node.tag == "time" and time_node is None:
+                if "datetime" in node.attributes:
+                    time_node = node
+
+        author = handle = None
+        if user_name_node is not None:
+            name_span = user_name_node.css_first("span span")
+            handle_span = user_name_node.css_first('div[dir="ltr"] span')
+            if name_span is not None:
+                author = _selectolax_text(name_span)
+            if handle_span is not None:
+                handle = _selectolax_text(handle_span)
+                if not handle.startswith("@"):
+                    handle = None
+            if not author and not handle:
+                author = _selectolax_text(user_name_node, " ")
+
+        href = tweeted_at = None
+        if time_node is not None:
+            tweeted_at = time_node.attributes["datetime"]
+            anchor = time_node.parent
+            while anchor is not None and anchor.tag != "a":
+                anchor = anchor.parent
+            if anchor is not None:
+                href = anchor.attributes.get("href")
+
+        record = _build_record(
+            _selectolax_text(text_node) if text_node is not None else None,
+            author,
+            handle,
+            href,
+            tweeted_at,
+        )
+        if record:
+            tweets.append(record)
+    return tweets
+
+
+def _parse_with_lxml(page_source):
+    tweets = []
+    for article in lxml.html.document_fromstring(page_source).iter("article"):
+        if article.get("data-testid") != "tweet":
+            continue
+        # One walk over the article finds the first of each field element
+        text_element = user_name_element = time_element = None
+        for element in article.iter("div", "time"):
+            if element.tag == "div":
+                test_id = element.get("data-testid")
+                if test_id == "tweetText" and text_element is None:
+                    text_element = element
+                elif test_id == "User-Name" and user_name_element is None:
+                    user_name_element = element
+            elif time_element is None and element.get("datetime") is not None:
+                time_element = element
+
+        author = handle = None
+        if user_name_element is not None:
+            name_spans = _LXML_NAME_SPANS(user_name_element)
+            handle_spans = _LXML_HANDLE_SPANS(user_name_element)
+            if name_spans:
+                author = _joined_text(name_spans[0].itertext())
+            if handle_spans:
+                handle = _joined_text(handle_spans[0].itertext())
+                if not handle.startswith("@"):
+                    handle = None
+            if not author and not handle:
+                author = _joined_text(user_name_element.itertext(), " ")
+
+        href = tweeted_at = None
+        if time_element is not None:
+            tweeted_at = time_element.get("datetime")
+            anchor = next(time_element.iterancestors("a"), None)
+            if anchor is not None:
+                href = anchor.get("href")
+
+        record = _build_record(
+            _joined_text(text_element.itertext()) if text_element is not None else None,
+            author,
+            handle,
+            href,
+            tweeted_at,
+        )
+        if record:
+            tweets.append(record)
+    return tweets
+
+
+# Fastest first; "auto" picks the first one that is installed
+HTML_PARSERS = {
+    "selectolax": _parse_with_selectolax if LexborHTMLParser else None,
+    "lxml": _parse_with_lxml if lxml else None,
+    "beautifulsoup": _parse_with_beautifulsoup,
+}
+
+
+def resolve_html_parser(name="auto"):
+    """Returns the parser backend name to use for name ("auto" or a backend)."""
+    if name == "auto":
+        return next(backend for backend, parse in HTML_PARSERS.items() if parse)
+    if name not in HTML_PARSERS:
+        raise ValueError(
+            f"Unknown HTML parser {name!r}; use auto or one of {', '.join(HTML_PARSERS)}."
+        )
+    if HTML_PARSERS[name] is None:
+        raise ValueError(f"HTML parser {name!r} is not installed.")
+    return name
+
+
+def parse_tweets_from_html(page_source, parser="auto"):
+    """Parses every tweet article in a page_source snapshot into tweet records.
+
+    parser picks the backend (see HTML_PARSERS); all of them return the same
+    records, the faster ones just need selectolax or lxml to be installed.
+    """
+    return HTML_PARSERS[resolve_html_parser(parser)](page_source)
+
+
+# --- In-page extraction ---
+# Same field lookups as parse_tweets_from_html, but run inside the browser so only
+# articles that have not been returned before cross the WebDriver wire. Returns
+# null for articles without a status link or whose text has not rendered yet.
+# Text is joined from stripped text nodes like _joined_text, so records match
+# the ones parsed from page_source.
+ARTICLE_RECORD_JS = """
+function xDigestText(element, separator = "") {
+    const walker = document.createTreeWalker(element, NodeFilter.SHOW_TEXT);
+    const parts = [];
+    while (walker.nextNode()) {
+        const text = walker.currentNode.nodeValue.trim();
+        if (text) parts.push(text);
+    }
+    return parts.join(separator);
+}
+
+function xDigestArticleRecord(article) {
+    const time = article.querySelector("time[datetime]");
+    const anchor = time ? time.closest("a") : null;
+    const href = anchor ? anchor.getAttribute("href") : null;
+    const match = href ? href.match(/\\/status\\/(\\d+)/) : null;
+    if (!match) return null;
+
+    const textElement = article.querySelector('div[data-testid="tweetText"]');
+    const text = textElement ? xDigestText(textElement) : "";
+    if (!text) return null;
+
+    let author = null;
+    let handle = null;
+    const userName = article.querySelector('div[data-testid="User-Name"]');
+    if (userName) {
+        const nameSpan = userName.querySelector("span span");
+        const handleSpan = userName.querySelector('div[dir="ltr"] span');
+        if (nameSpan) author = xDigestText(nameSpan);
+        if (handleSpan && xDigestText(handleSpan).startsWith("@")) {
+            handle = xDigestText(handleSpan);
+        }
+        if (!author && !handle) author = xDigestText(userName, " ");
+    }
+
+    return {
+        id: match[1],
+        author: author,
+        handle: handle,
+        text: text,
+        link: "https://x.com" + href,
+        time: time.getAttribute("datetime"),
+    };
+}
+"""
+
+# Status IDs already returned are remembered on `window`, so the work per scroll
+# is proportional to the number of new articles rather than the size of the page.
+EXTRACT_NEW_TWEETS_JS = ARTICLE_RECORD_JS + """
+const reset = arguments[0];
+if (reset || !window.__xDigestSeen) {
+    window.__xDigestSeen = new Set();
+}
+const seen = window.__xDigestSeen;
+const records = [];
+for (const article of document.querySelectorAll(%s)) {
+    const record = xDigestArticleRecord(article);
+    if (!record || seen.has(record.id)) continue;
+    seen.add(record.id);
+    records.push(record);
+}
+return JSON.stringify(records);
+""" % json.dumps(TWEET_SELECTOR)
+
+# X virtualizes the timeline and drops articles once they scroll out of view, so
+# the observer records each article as it is inserted (or as its text renders)
+# and buffers it until Python drains the buffer.
+INSTALL_TIMELINE_OBSERVER_JS = (
+    ARTICLE_RECORD_JS
+    + """
+const reset = arguments[0];
+const timeline = document.querySelector(%s);
+if (!timeline) return false;
+if (window.__xDigestObserver) window.__xDigestObserver.disconnect();
+if (reset || !window.__xDigestStreamSeen) {
+    window.__xDigestStreamSeen = new Set();
+    window.__xDigestBuffer = [];
+}
+const seen = window.__xDigestStreamSeen;
+const buffer = window.__xDigestBuffer;
+const collect = (article) => {
+    const record = xDigestArticleRecord(article);
+    if (!record || seen.has(record.id)) return;
+    seen.add(record.id);
+    buffer.push(record);
+};
+
+window.__xDigestObserver = new MutationObserver((mutations) => {
+    const articles = new Set();
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (node.nodeType !== Node.ELEMENT_NODE) continue;
+            // Late-rendering content lands inside an existing article
+            const parent = node.closest(%s);
+            if (parent) {
+                articles.add(parent);
+            } else {
+                node.querySelectorAll(%s).forEach((article) => articles.add(article));
+            }
+        }
+    }
+    articles.forEach(collect);
+});
+window.__xDigestObserver.observe(timeline, { childList: true, subtree: true });
+window.__xDigestTimeline = timeline;
+
+// Articles rendered before the observer was installed
+timeline.querySelectorAll(%s).forEach(collect);
+return true;
+"""
+    % (
+        json.dumps(TIMELINE_SELECTOR),
+        json.dumps(TWEET_SELECTOR),
+        json.dumps(TWEET_SELECTOR),
+        json.dumps(TWEET_SELECTOR),
+    )
+)
+
+# Returns null when the observer is gone (e.g. X replaced the timeline container)
+DRAIN_TIMELINE_OBSERVER_JS = """
+if (!window.__xDigestTimeline || !window.__xDigestTimeline.isConnected) return null;
+return JSON.stringify(window.__xDigestBuffer.splice(0, arguments[0]));
+"""
+
+
+def _records_to_tweets(records):
+    """Converts records returned by the in-page scripts into tweet records."""
+    return [
+        make_tweet_record(
+            record["author"],
+            record["handle"],
+            record["text"],
+            record["link"],
+            record["time"],
+        )
+        for record in records
+    ]
+
+
+def extract_new_tweets(driver, reset=False):
+    """Returns records for tweet articles not returned by a previous call on this page."""
+    return _records_to_tweets(
+        json.loads(driver.execute_script(EXTRACT_NEW_TWEETS_JS, reset))
+    )
+
+
+def install_timeline_observer(driver, reset=True):
+    """Installs the streaming timeline collector; returns False if there is no timeline."""
+    return bool(driver.execute_script(INSTALL_TIMELINE_OBSERVER_JS, reset))
+
+
+def drain_timeline_observer(driver, batch_size=OBSERVER_BATCH_SIZE):
+    """Drains buffered tweets from the timeline collector in batches of batch_size."""
+    tweets = []
+    while True:
+        payload = driver.execute_script(DRAIN_TIMELINE_OBSERVER_JS, batch_size)
+        if payload is None:
+            # Timeline container was replaced; re-attach without losing seen IDs
+            print("Timeline observer detached, reinstalling...")
+            if not install_timeline_observer(driver, reset=False):
+                break
+            continue
+        batch = json.loads(payload)
+        tweets.extend(_records_to_tweets(batch))
+        if len(batch) < batch_size:
+            break
+    return tweets
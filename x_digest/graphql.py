@@ -0,0 +1,252 @@
+"""Tweet capture from X's HomeTimeline GraphQL responses via the Chrome DevTools Protocol.
+
+Decoding works on plain JSON payloads, so recorded responses can be replayed
+offline:
+
+    python -m x_digest.graphql recorded/*.json
+"""
+
+import base64
+import html
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+from x_digest.extract import make_tweet_record
+
+# GraphQL operations that carry the home timeline ("For you" and "Following")
+TIMELINE_URL_PATTERN = re.compile(r"/graphql/[^/]+/(HomeTimeline|HomeLatestTimeline)\b")
+TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def enable_network_capture(options):
+    """Turns on Chrome's performance log so network events reach get_log("performance")."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+# --- Decoding ---
+
+
+def _unwrap_tweet(result):
+    """Returns the Tweet object inside a tweet_results.result, or None if unavailable."""
+    if not result:
+        return None
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet")
+    if not result or "legacy" not in result or "rest_id" not in result:
+        return None  # TweetTombstone, TweetUnavailable, ...
+    return result
+
+
+def _user_names(tweet):
+    """Returns (display name, screen name) of a tweet's author."""
+    user = tweet.get("core", {}).get("user_results", {}).get("result", {})
+    # Newer payloads moved name/screen_name from user.legacy to user.core
+    core = user.get("core", {})
+    legacy = user.get("legacy", {})
+    return (
+        core.get("name") or legacy.get("name"),
+        core.get("screen_name") or legacy.get("screen_name"),
+    )
+
+
+def _tweet_text(tweet):
+    """Returns the untruncated text of a tweet with t.co links expanded."""
+    legacy = tweet["legacy"]
+    note = tweet.get("note_tweet", {}).get("note_tweet_results", {}).get("result")
+    text = note["text"] if note and note.get("text") else legacy.get("full_text", "")
+    entities = legacy.get("entities", {})
+    for url in entities.get("urls", []):
+        if url.get("url") and url.get("expanded_url"):
+            text = text.replace(url["url"], url["expanded_url"])
+    for media in entities.get("media", []):
+        # Trailing t.co link to attached photos/videos
+        if media.get("url"):
+            text = text.replace(media["url"], "")
+    return html.unescape(text).strip()
+
+
+def _tweet_time(tweet):
+    """Converts legacy.created_at to the ISO format of the timeline's <time datetime>."""
+    created_at = tweet["legacy"].get("created_at")
+    if not created_at:
+        return None
+    try:
+        parsed = datetime.strptime(created_at, TWITTER_TIME_FORMAT)
+    except ValueError:
+        return None
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _tweet_metrics(tweet):
+    """Returns the engagement counts of a tweet."""
+    legacy = tweet["legacy"]
+    views = tweet.get("views", {}).get("count")
+    return {
+        "likes": legacy.get("favorite_count", 0),
+        "retweets": legacy.get("retweet_count", 0),
+        "replies": legacy.get("reply_count", 0),
+        "quotes": legacy.get("quote_count", 0),
+        "bookmarks": legacy.get("bookmark_count", 0),
+        "views": int(views) if views else 0,
+    }
+
+
+def decode_tweet(result):
+    """Decodes a tweet_results.result object into a tweet record, or None.
+
+    Retweets are decoded as the original tweet (matching what the timeline shows)
+    with the retweeter's handle in `retweeted_by`.
+    """
+    tweet = _unwrap_tweet(result)
+    if not tweet:
+        return None
+
+    retweeted_by = None
+    original = _unwrap_tweet(
+        tweet["legacy"].get("retweeted_status_result", {}).get("result")
+    )
+    if original:
+        retweeted_by = "@" + (_user_names(tweet)[1] or "")
+        tweet = original
+
+    text = _tweet_text(tweet)
+    author, screen_name = _user_names(tweet)
+    if not text or not screen_name:
+        return None
+
+    record = make_tweet_record(
+        author,
+        f"@{screen_name}",
+        text,
+        f"https://x.com/{screen_name}/status/{tweet['rest_id']}",
+        _tweet_time(tweet),
+    )
+    record["metrics"] = _tweet_metrics(tweet)
+    record["retweeted_by"] = retweeted_by
+
+    quoted = _unwrap_tweet(tweet.get("quoted_status_result", {}).get("result"))
+    record["quoted"] = None
+    if quoted:
+        _, quoted_screen_name = _user_names(quoted)
+        record["quoted"] = {
+            "handle": f"@{quoted_screen_name}",
+            "text": _tweet_text(quoted),
+            "link": f"https://x.com/{quoted_screen_name}/status/{quoted['rest_id']}",
+        }
+    return record
+
+
+def _timeline_instructions(payload):
+    """Returns the instruction list of a HomeTimeline/HomeLatestTimeline response."""
+    home = payload.get("data", {}).get("home", {})
+    timeline = (
+        home.get("home_timeline_urt") or home.get("home_latest_timeline_urt") or {}
+    )
+    return timeline.get("instructions", [])
+
+
+def _entry_item_contents(entry):
+    """Yields the itemContent objects of a timeline entry (single item or module)."""
+    content = entry.get("content", {})
+    if "itemContent" in content:
+        yield content["itemContent"]
+    for item in content.get("items", []):  # TimelineTimelineModule (threads)
+        item_content = item.get("item", {}).get("itemContent")
+        if item_content:
+            yield item_content
+
+
+def decode_timeline_response(payload):
+    """Decodes a HomeTimeline GraphQL response into tweet records, skipping ads."""
+    tweets = []
+    for instruction in _timeline_instructions(payload):
+        entries = instruction.get("entries", [])
+        if "entry" in instruction:  # TimelineReplaceEntry / TimelinePinEntry
+            entries = [instruction["entry"]]
+        for entry in entries:
+            for item_content in _entry_item_contents(entry):
+                if item_content.get("promotedMetadata"):
+                    continue
+                record = decode_tweet(
+                    item_content.get("tweet_results", {}).get("result")
+                )
+                if record:
+                    tweets.append(record)
+    return tweets
+
+
+# --- Capture ---
+
+
+class TimelineCapture:
+    """Collects HomeTimeline responses from the Chrome performance log.
+
+    Requires a driver created with enable_network_capture(). When record_dir is
+    set, every captured response body is also written there as a JSON fixture.
+    """
+
+    def __init__(self, driver, record_dir=None):
+        self.driver = driver
+        self.record_dir = record_dir
+        self._pending = {}  # requestId -> operation name, waiting for loadingFinished
+        self._recorded = 0
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+
+    def drain(self):
+        """Returns tweets from timeline responses that finished loading since the last call."""
+        tweets = []
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            params = message.get("params", {})
+
+            if method == "Network.responseReceived":
+                match = TIMELINE_URL_PATTERN.search(params["response"]["url"])
+                if match:
+                    self._pending[params["requestId"]] = match.group(1)
+            elif method == "Network.loadingFinished":
+                operation = self._pending.pop(params["requestId"], None)
+                if operation:
+                    payload = self._response_json(params["requestId"], operation)
+                    if payload:
+                        tweets.extend(decode_timeline_response(payload))
+        return tweets
+
+    def _response_json(self, request_id, operation):
+        """Fetches and decodes a response body, recording it if configured."""
+        try:
+            response = self.driver.execute_cdp_cmd(
+                "Network.getResponseBody", {"requestId": request_id}
+            )
+        except Exception as e:
+            # Chrome evicts bodies from its buffer under memory pressure
+            print(f"Could not read {operation} response body: {e}")
+            return None
+        body = response["body"]
+        if response.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8")
+        if self.record_dir:
+            self._recorded += 1
+            path = os.path.join(
+                self.record_dir,
+                f"{int(time.time())}-{self._recorded:03d}-{operation}.json",
+            )
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(body)
+        return json.loads(body)
+
+
+if __name__ == "__main__":
+    # Offline check: decode recorded response fixtures and print the tweets found
+    for fixture_path in sys.argv[1:]:
+        with open(fixture_path, encoding="utf-8") as f:
+            fixture_tweets = decode_timeline_response(json.load(f))
+        print(f"{fixture_path}: {len(fixture_tweets)} tweets")
+        for fixture_tweet in fixture_tweets:
+            print(json.dumps(fixture_tweet, ensure_ascii=False))
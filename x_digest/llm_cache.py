@@ -0,0 +1,85 @@
+"""On-disk cache of Gemini digests, keyed by model, prompt version and tweet set."""
+
+import hashlib
+import json
+import os
+import time
+
+
+def digest_cache_key(model_name, prompt_version, tweets):
+    """Hashes everything that determines the digest; tweet order and spacing are ignored."""
+    normalized = sorted(
+        (
+            tweet["link"],
+            tweet["author"],
+            tweet["handle"],
+            " ".join(tweet["text"].split()),
+        )
+        for tweet in tweets
+    )
+    payload = json.dumps([model_name, prompt_version, normalized], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Directory of cached responses with a TTL and a total size cap.
+
+    Entries are evicted least-recently-used first once the directory grows
+    past max_bytes; reads refresh an entry's mtime.
+    """
+
+    def __init__(self, directory, ttl, max_bytes):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached response for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, response, **metadata):
+        """Stores a response and evicts old entries if the cache is over budget."""
+        entry = dict(metadata, response=response, created_at=time.time())
+        temp_path = self._path(key) + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        """Drops expired entries, then the least recently used until under max_bytes."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                os.remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
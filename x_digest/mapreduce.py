@@ -0,0 +1,90 @@
+"""Map-reduce digests for tweet sets too large for a single Gemini request.
+
+The map stage scores token-budgeted batches of tweets concurrently; the reduce
+stage sends only the best-scoring shortlist through the regular digest prompt,
+so the final output keeps the usual ### category format.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from x_digest.prompts import (
+    build_digest_prompt,
+    build_scoring_prompt,
+    extract_final_digest,
+    format_tweet_blob,
+    parse_scores,
+)
+from x_digest.retry import call_with_retries
+
+CHARS_PER_TOKEN = 4  # Rough average for English tweets
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 2  # Seconds; doubled on every retry
+UNSCORED = 5.0  # Score for tweets whose batch failed, so they are not silently dropped
+
+
+def estimate_tokens(text):
+    """Cheap token estimate; good enough for sizing batches."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_tweets(tweets, token_budget):
+    """Splits tweets into consecutive batches whose prompt text fits token_budget."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for tweet in tweets:
+        tokens = estimate_tokens(format_tweet_blob([tweet]))
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(tweet)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def generate_with_retries(generate, prompt):
+    """Calls generate(prompt), retrying rate limits and transient server errors."""
+    return call_with_retries(
+        lambda: generate(prompt), "Gemini", MAX_RETRIES, RETRY_BASE_DELAY
+    )
+
+
+def score_tweets(tweets, generate, token_budget, concurrency):
+    """Scores every tweet with concurrent map calls; returns scores aligned with tweets."""
+    chunks = chunk_tweets(tweets, token_budget)
+    print(
+        f"Scoring {len(tweets)} tweets in {len(chunks)} batches "
+        f"({concurrency} at a time)..."
+    )
+
+    def score_chunk(chunk):
+        try:
+            response_text = generate_with_retries(generate, build_scoring_prompt(chunk))
+        except Exception as e:
+            print(f"Scoring batch of {len(chunk)} tweets failed: {e}")
+            return [UNSCORED] * len(chunk)
+        scores = parse_scores(response_text, len(chunk))
+        return [scores.get(i, UNSCORED) for i in range(len(chunk))]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        chunk_scores = list(executor.map(score_chunk, chunks))
+    return [score for scores in chunk_scores for score in scores]
+
+
+def map_reduce_digest(
+    tweets, generate_map, generate_reduce, token_budget, concurrency, shortlist_size
+):
+    """Scores tweets in parallel batches, then digests the top shortlist_size of them."""
+    scores = score_tweets(tweets, generate_map, token_budget, concurrency)
+
+    # Keep timeline order within the shortlist; the digest prompt reads it top-down
+    ranked = sorted(range(len(tweets)), key=lambda i: scores[i], reverse=True)
+    shortlist = [tweets[i] for i in sorted(ranked[:shortlist_size])]
+    print(f"Reducing the top {len(shortlist)} tweets into the final digest...")
+
+    return extract_final_digest(
+        generate_with_retries(generate_reduce, build_digest_prompt(shortlist))
+    )
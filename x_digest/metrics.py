@@ -0,0 +1,85 @@
+"""Run instrumentation: stage timings and counters as JSON lines and Prometheus text.
+
+Every measurement is appended to the JSON lines file as it happens, tagged
+with the run ID, so a crashed run still leaves its numbers behind. At the end
+of a run the aggregated values can also be written in the Prometheus text
+format (e.g. for node_exporter's textfile collector).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = "x_digest"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Collects measurements for the current run; safe to use from several threads."""
+
+    def __init__(self, path=None, prometheus_path=None):
+        self.path = path
+        self.prometheus_path = prometheus_path
+        self.run_id = None
+        self._lock = threading.Lock()
+        self._series = {}  # (name, sorted labels) -> [count, sum, last]
+
+    def start_run(self, run_id):
+        """Tags subsequent measurements with run_id and clears the aggregates."""
+        with self._lock:
+            self.run_id = run_id
+            self._series = {}
+
+    def record(self, name, value, **labels):
+        """Records one measurement (seconds, bytes, count...) with optional labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.setdefault(key, [0, 0.0, 0.0])
+            series[0] += 1
+            series[1] += value
+            series[2] = value
+            if self.path:
+                event = {"ts": round(time.time(), 3), "run": self.run_id, "name": name}
+                event.update(labels)
+                event["value"] = round(value, 4) if isinstance(value, float) else value
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Records the duration of the with block in seconds, with status=ok/error."""
+        start = time.monotonic()
+        status = "error"
+        try:
+            yield
+            status = "ok"
+        finally:
+            self.record(name, time.monotonic() - start, status=status, **labels)
+
+    def write_prometheus(self):
+        """Writes every series as <name>_count/_sum/_last in Prometheus text format."""
+        if not self.prometheus_path:
+            return
+        with self._lock:
+            series = sorted(self._series.items())
+
+        lines = []
+        for (name, labels), (count, total, last) in series:
+            label_text = ",".join(
+                f'{key}="{_escape_label(value)}"' for key, value in labels
+            )
+            label_text = f"{{{label_text}}}" if label_text else ""
+            metric = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"{metric}_count{label_text} {count}")
+            lines.append(f"{metric}_sum{label_text} {total:g}")
+            lines.append(f"{metric}_last{label_text} {last:g}")
+
+        temp_path = self.prometheus_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.prometheus_path)
@@ -0,0 +1,199 @@
+"""Durable outbox so a failed email send does not waste the scrape and Gemini run.
+
+Rendered messages are written to disk before anything is sent, one JSON file
+per message in pending/. A successful send moves the file to delivered/; a
+failed one stays pending with its next attempt pushed back exponentially, and
+a message that keeps failing for MAX_ATTEMPTS moves to failed/ for inspection.
+A failed batch is retried as the same batch under the same idempotency key.
+Pending messages are retried at the start of the next run or by
+--flush-outbox, which keeps going until the outbox is empty.
+
+tests/fake_resend.py is a local fake Resend endpoint for exercising the retry
+path; see tests/test_outbox.py.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from x_digest.delivery import batch_key, deliver_messages
+
+MAX_ATTEMPTS = 10
+RETRY_BASE_DELAY = 60  # Seconds before the first retry; doubled after each failure
+MAX_RETRY_DELAY = 6 * 3600
+DELIVERED_TTL = 30 * 24 * 3600  # Seconds delivered messages are kept for reference
+STATES = ("pending", "delivered", "failed")
+# Fields of a pending message that re-enqueueing it leaves alone
+RETRY_STATE = ("attempts", "next_attempt_at", "created_at", "last_error", "batch_key")
+
+
+def message_id(key):
+    """File name for a message; the same recipient/run always maps to one file."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class Outbox:
+    """Directory-backed queue of rendered emails awaiting delivery."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        for state in STATES:
+            os.makedirs(os.path.join(directory, state), exist_ok=True)
+
+    def _path(self, state, entry_id):
+        return os.path.join(self.directory, state, f"{entry_id}.json")
+
+    def _write(self, state, entry):
+        path = self._path(state, entry["id"])
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _entries(self, state):
+        directory = os.path.join(self.directory, state)
+        entries = []
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Removed or half-written by another process
+        return sorted(entries, key=lambda entry: entry["created_at"])
+
+    def _read(self, state, entry_id):
+        try:
+            with open(self._path(state, entry_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def enqueue(self, messages):
+        """Persists messages as pending; ones already delivered are skipped.
+
+        A message that is already pending keeps its attempts, retry schedule and
+        batch, so re-enqueueing it (e.g. on --resume) does not reset its backoff.
+        Returns the messages that had already been delivered with identical
+        content (e.g. when a run is resumed after the outbox caught up).
+        """
+        self._prune_delivered()
+        already_delivered = []
+        for message in messages:
+            entry_id = message_id(message["key"])
+            delivered = self._read("delivered", entry_id)
+            if delivered:
+                print(f"Already delivered {message['key']}, skipping.")
+                if delivered["params"] == message["params"]:
+                    already_delivered.append(message)
+                continue
+            state = {
+                "attempts": 0,
+                "next_attempt_at": 0,
+                "created_at": time.time(),
+                "last_error": None,
+            }
+            pending = self._read("pending", entry_id)
+            if pending:
+                state = {
+                    field: pending[field] for field in RETRY_STATE if field in pending
+                }
+            self._write("pending", dict(message, id=entry_id, **state))
+        return already_delivered
+
+    def pending(self, now=None):
+        """Returns pending messages whose next attempt is due."""
+        now = now or time.time()
+        return [
+            entry
+            for entry in self._entries("pending")
+            if entry["next_attempt_at"] <= now
+        ]
+
+    def next_attempt_at(self):
+        """Time of the earliest pending retry, or None if nothing is pending."""
+        return min(
+            (entry["next_attempt_at"] for entry in self._entries("pending")),
+            default=None,
+        )
+
+    def mark_delivered(self, entry):
+        """Moves a message to delivered/."""
+        entry = dict(entry, delivered_at=time.time())
+        self._write("delivered", entry)
+        os.remove(self._path("pending", entry["id"]))
+
+    def mark_failed(self, entry, error, batch_key=None):
+        """Schedules the next attempt, or gives up after MAX_ATTEMPTS.
+
+        batch_key is the idempotency key of the failed batch; the retry resends
+        the same batch under it, so Resend can drop a batch that did go through.
+        """
+        attempts = entry["attempts"] + 1
+        delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+        entry = dict(
+            entry,
+            attempts=attempts,
+            next_attempt_at=time.time() + delay,
+            last_error=str(error),
+            batch_key=batch_key or entry.get("batch_key"),
+        )
+        if attempts >= MAX_ATTEMPTS:
+            print(f"Giving up on {entry['key']} after {attempts} attempts.")
+            self._write("failed", entry)
+            os.remove(self._path("pending", entry["id"]))
+        else:
+            self._write("pending", entry)
+
+    def flush(self, send_batch, concurrency):
+        """Sends every due message; returns the ones delivered."""
+        due = self.pending()
+        if not due:
+            return []
+        print(f"Sending {len(due)} messages from the outbox...")
+
+        failed = {}
+
+        def on_failure(batch, error):
+            key = batch_key(batch)
+            for entry in batch:
+                failed[entry["id"]] = (error, key)
+
+        delivered = deliver_messages(
+            due, send_batch, concurrency, on_failure=on_failure
+        )
+        for entry in delivered:
+            self.mark_delivered(entry)
+        for entry in due:
+            if entry["id"] in failed:
+                self.mark_failed(entry, *failed[entry["id"]])
+        return delivered
+
+    def drain(self, send_batch, concurrency, on_delivered=None):
+        """Flushes until nothing is pending, sleeping until each retry is due.
+
+        on_delivered(messages) is called after every flush that delivered any.
+        """
+        while True:
+            delivered = self.flush(send_batch, concurrency)
+            if delivered and on_delivered:
+                on_delivered(delivered)
+            next_attempt_at = self.next_attempt_at()
+            if next_attempt_at is None:
+                print("Outbox is empty.")
+                return
+            delay = max(0, next_attempt_at - time.time())
+            print(f"Next outbox retry in {delay:.0f}s...")
+            time.sleep(delay)
+
+    def _prune_delivered(self):
+        """Deletes delivered messages older than DELIVERED_TTL."""
+        cutoff = time.time() - DELIVERED_TTL
+        for entry in self._entries("delivered"):
+            if entry.get("delivered_at", 0) < cutoff:
+                try:
+                    os.remove(self._path("delivered", entry["id"]))
+                except OSError:
+                    pass
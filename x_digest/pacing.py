@@ -0,0 +1,142 @@
+"""Adaptive waiting for new timeline content after each scroll."""
+
+import json
+import time
+
+from x_digest.extract import TWEET_SELECTOR
+
+POLL_INTERVAL = 0.25  # Seconds between timeline probes
+SETTLE_TIME = 0.5  # Seconds of network quiet before new content counts as loaded
+BACKOFF_FACTOR = 1.5  # Growth of the wait budget after a scroll that timed out
+
+# Cheap snapshot of timeline progress. `fresh` counts rendered tweets whose
+# permalink is not among the links already scraped; the page keeps those in a
+# Set and each probe sends only the links added since the last one
+# (arguments[0]), or all of them with arguments[1] set. If the page lost the
+# Set (e.g. it was reloaded) the probe returns {resync: true} instead.
+# `resources` counts completed network responses via a PerformanceObserver,
+# which unlike the resource timing buffer never fills up.
+TIMELINE_PROBE_JS = """
+if (!window.__xDigestResources) {
+    window.__xDigestResources = { count: 0 };
+    new PerformanceObserver((list) => {
+        window.__xDigestResources.count += list.getEntries().length;
+    }).observe({ type: "resource", buffered: true });
+}
+if (arguments[1]) {
+    window.__xDigestKnown = new Set();
+} else if (!window.__xDigestKnown) {
+    return { resync: true };
+}
+const known = window.__xDigestKnown;
+for (const link of arguments[0]) known.add(link);
+const articles = document.querySelectorAll(%s);
+let fresh = 0;
+let last = null;
+for (const article of articles) {
+    const time = article.querySelector("time[datetime]");
+    const anchor = time ? time.closest("a") : null;
+    const href = anchor ? anchor.getAttribute("href") : null;
+    if (!href || !href.includes("/status/")) continue;
+    last = href;
+    if (!known.has("https://x.com" + href) &&
+        article.querySelector('div[data-testid="tweetText"]')) {
+        fresh++;
+    }
+}
+return {
+    height: document.body.scrollHeight,
+    last: last,
+    fresh: fresh,
+    resources: window.__xDigestResources.count,
+};
+""" % json.dumps(TWEET_SELECTOR)
+
+
+def probe_timeline(driver, added_links=(), reset=True):
+    """Returns a snapshot of the timeline's height, newest tweet and network activity.
+
+    added_links are added to the page's set of scraped links, which reset clears
+    first; without reset the snapshot is {"resync": True} if the page has no set.
+    """
+    return driver.execute_script(TIMELINE_PROBE_JS, list(added_links), reset)
+
+
+class ScrollPacer:
+    """Waits only as long as X needs to load the next page of the timeline.
+
+    Each wait returns as soon as new tweets have rendered and the network has been
+    quiet for SETTLE_TIME, or as soon as the DOM already holds enough unscraped
+    tweets to reach the target. A wait that times out grows the budget for the next
+    scroll (up to max_wait) so a slow connection is not cut short repeatedly; a
+    successful wait shrinks it back toward base_wait.
+    """
+
+    def __init__(self, base_wait, max_wait):
+        self.base_wait = base_wait
+        self.max_wait = max(max_wait, base_wait)
+        self.current_wait = base_wait
+        # Links the page already knows; None until the first probe
+        self._synced_links = None
+
+    def probe(self, driver, known_links):
+        """Probes the timeline, sending the page only the links it doesn't have yet."""
+        if self._synced_links is not None:
+            # known_links only grows, so an unchanged size means nothing was added
+            added = []
+            if len(known_links) != len(self._synced_links):
+                added = [link for link in known_links if link not in self._synced_links]
+            probe = probe_timeline(driver, added, reset=False)
+            if not probe.get("resync"):
+                self._synced_links.update(added)
+                return probe
+        self._synced_links = set(known_links)
+        return probe_timeline(driver, self._synced_links, reset=True)
+
+    def scroll(self, driver, known_links, needed):
+        """Scrolls to the bottom of the timeline and waits for new content."""
+        before = self.probe(driver, known_links)
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        return self.wait(driver, before, known_links, needed)
+
+    def wait(self, driver, before, known_links, needed):
+        """Polls the timeline until new content has loaded; returns the last probe."""
+        start = time.monotonic()
+        deadline = start + self.current_wait
+        resources = before["resources"]
+        last_activity = start
+
+        while True:
+            time.sleep(POLL_INTERVAL)
+            probe = self.probe(driver, known_links)
+            now = time.monotonic()
+
+            if needed > 0 and probe["fresh"] >= needed:
+                print(
+                    f"Target reachable from tweets already loaded ({now - start:.1f}s)."
+                )
+                self._relax()
+                return probe
+
+            if probe["resources"] != resources:
+                resources = probe["resources"]
+                last_activity = now
+
+            changed = (
+                probe["height"] != before["height"] or probe["last"] != before["last"]
+            )
+            if changed and now - last_activity >= SETTLE_TIME:
+                print(f"New tweets loaded after {now - start:.1f}s.")
+                self._relax()
+                return probe
+
+            if now >= deadline:
+                print(f"No new tweets after {self.current_wait:.1f}s, backing off.")
+                self.current_wait = min(
+                    self.current_wait * BACKOFF_FACTOR, self.max_wait
+                )
+                return probe
+
+    def _relax(self):
+        """Moves the wait budget back toward base_wait after a successful wait."""
+        self.current_wait = max(self.base_wait, self.current_wait / BACKOFF_FACTOR)
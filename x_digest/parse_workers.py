@@ -0,0 +1,82 @@
+"""Parses page_source snapshots in worker processes while the browser keeps scrolling.
+
+The scroll loop hands each snapshot to a ParsedSnapshots queue and picks up
+whatever has finished parsing by the next scroll, so waiting for X to load
+more tweets overlaps with the CPU-bound HTML parsing and the parsing itself
+runs on the host's other cores. Results come back in scroll order; the
+scraper's usual de-duplication by permalink merges them.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from x_digest.extract import parse_tweets_from_html, resolve_html_parser
+
+
+def _parse_snapshot(page_source, parser):
+    """Runs in a worker process; returns the tweets and the parse time."""
+    start = time.monotonic()
+    tweets = parse_tweets_from_html(page_source, parser)
+    return tweets, time.monotonic() - start
+
+
+class ParsePool:
+    """A process pool shared by every scrape; workers start on first use."""
+
+    def __init__(self, workers, parser="auto"):
+        self.workers = workers
+        self.parser = resolve_html_parser(parser)
+        self._executor = None
+        self._lock = threading.Lock()  # Accounts may be scraped concurrently
+
+    def submit(self, page_source):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor.submit(_parse_snapshot, page_source, self.parser)
+
+    def close(self):
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class ParsedSnapshots:
+    """The snapshots one scrape has queued, handed back in the order they were taken.
+
+    on_parsed(seconds) is called with each snapshot's parse time in its worker.
+    """
+
+    def __init__(self, pool, on_parsed=None):
+        self.pool = pool
+        self.on_parsed = on_parsed
+        self._pending = deque()
+
+    def submit(self, page_source):
+        self._pending.append(self.pool.submit(page_source))
+
+    def ready(self, wait=False):
+        """Returns the tweets of the finished snapshots at the front of the queue.
+
+        With wait, blocks until every queued snapshot has been parsed.
+        """
+        tweets = []
+        while self._pending and (wait or self._pending[0].done()):
+            future = self._pending.popleft()
+            try:
+                snapshot_tweets, seconds = future.result()
+            except Exception as e:
+                print(f"Parsing a page snapshot failed: {e}")
+                continue
+            if self.on_parsed:
+                self.on_parsed(seconds)
+            tweets.extend(snapshot_tweets)
+        return tweets
+
+    def cancel(self):
+        """Drops snapshots that are no longer needed (e.g. the target was reached)."""
+        while self._pending:
+            self._pending.popleft().cancel()
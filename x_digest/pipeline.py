@@ -0,0 +1,110 @@
+"""Stage runner that checkpoints every stage so a failed run can resume.
+
+Each run lives in RUNS_DIR/<run_id>/ with one checkpoint file per completed
+stage (JSON for structured output, plain text otherwise). Resuming skips every
+stage that already has a checkpoint, so a failed email send no longer means
+relaunching the browser and calling Gemini again.
+"""
+
+import json
+import os
+import time
+from collections import namedtuple
+
+# run(pipeline_run) returns the stage output; checkpoint is its file name
+Stage = namedtuple("Stage", "name run checkpoint")
+
+
+def new_run_id():
+    """Timestamped run ID, sortable by start time."""
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+def latest_run_id(runs_dir):
+    """Returns the most recent run ID in runs_dir, or None."""
+    try:
+        run_ids = [
+            name
+            for name in os.listdir(runs_dir)
+            if os.path.isdir(os.path.join(runs_dir, name))
+        ]
+    except FileNotFoundError:
+        return None
+    return max(run_ids, default=None)
+
+
+class PipelineRun:
+    """One run's checkpoints, plus in-memory values handed between stages."""
+
+    def __init__(self, stages, runs_dir, run_id, metrics=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.run_id = run_id
+        self.directory = os.path.join(runs_dir, run_id)
+        self.memo = {}  # Not checkpointed; lost when a run is resumed
+        self.metrics = metrics
+        self._outputs = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, self.stages[name].checkpoint)
+
+    def completed(self, name):
+        """True if the stage has a checkpoint in this run."""
+        return os.path.exists(self._path(name))
+
+    def output(self, name):
+        """Returns a stage's output, loading its checkpoint if needed."""
+        if name not in self._outputs:
+            path = self._path(name)
+            if not os.path.exists(path):
+                raise RuntimeError(
+                    f"Run {self.run_id} has no checkpoint for the {name} stage."
+                )
+            with open(path, encoding="utf-8") as f:
+                self._outputs[name] = (
+                    json.load(f) if path.endswith(".json") else f.read()
+                )
+        return self._outputs[name]
+
+    def save(self, name, value):
+        """Checkpoints a stage's output atomically."""
+        path = self._path(name)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(value, f, ensure_ascii=False)
+            else:
+                f.write(value)
+        os.replace(temp_path, path)
+        self._outputs[name] = value
+
+    def run(self, resume=False, only=None):
+        """Runs the stages in order; resume skips checkpointed ones, only runs one."""
+        for name in self.order:
+            if only and name != only:
+                continue
+            if resume and not only and self.completed(name):
+                print(f"Skipping {name} stage (checkpointed in run {self.run_id}).")
+                continue
+
+            print(f"\n--- Stage: {name} (run {self.run_id}) ---")
+            start = time.monotonic()
+            try:
+                value = self.stages[name].run(self)
+            except Exception:
+                self._record(name, start, "error")
+                print(
+                    f"The {name} stage failed; rerun with "
+                    f"--resume --run-id {self.run_id} to continue from it."
+                )
+                raise
+            self.save(name, value)
+            self._record(name, start, "ok")
+            print(f"Stage {name} finished in {time.monotonic() - start:.1f}s.")
+
+    def _record(self, name, start, status):
+        if self.metrics:
+            self.metrics.record(
+                "stage_seconds", time.monotonic() - start, stage=name, status=status
+            )
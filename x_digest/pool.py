@@ -0,0 +1,144 @@
+"""Concurrent scraping of several X accounts through a bounded pool of browsers."""
+
+import json
+import os
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+Account = namedtuple("Account", "name username password session_file")
+
+
+def load_accounts(path):
+    """Loads account profiles from a JSON list; a missing file means no accounts.
+
+    Each entry has a username and either a password or password_env naming the
+    environment variable that holds it. name defaults to the username and
+    session_file to .x_session.<name>.json.
+    """
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return []
+
+    accounts = []
+    for entry in entries:
+        name = entry.get("name") or entry["username"]
+        password = entry.get("password")
+        if password is None and entry.get("password_env"):
+            password = os.getenv(entry["password_env"])
+        accounts.append(
+            Account(
+                name,
+                entry["username"],
+                password,
+                entry.get("session_file") or f".x_session.{name}.json",
+            )
+        )
+    return accounts
+
+
+class BrowserPool:
+    """Hands out at most `size` browsers, started on demand and reused between accounts.
+
+    reset(driver) runs when a browser is returned (e.g. to log it out before the
+    next account uses it). A browser whose user raised is quit rather than
+    reused, since it may be left in an unknown state.
+    """
+
+    def __init__(self, create_driver, size, reset=None):
+        self.create_driver = create_driver
+        self.size = max(1, size)
+        self.reset = reset
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._drivers = []
+
+    @contextmanager
+    def driver(self):
+        """Borrows a browser for the duration of the with block."""
+        with self._slots:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self.create_driver()
+                with self._lock:
+                    self._drivers.append(driver)
+
+            reusable = False
+            try:
+                yield driver
+                if self.reset:
+                    self.reset(driver)
+                reusable = True
+            finally:
+                if reusable:
+                    self._idle.put(driver)
+                else:
+                    self._discard(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """Quits every browser the pool started."""
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def scrape_accounts(accounts, pool, scrape_account):
+    """Runs scrape_account(driver, account) for every account, pool.size at a time.
+
+    Returns {account name: tweets} in account order; accounts that failed are
+    reported and left out.
+    """
+    print(f"Scraping {len(accounts)} accounts with up to {pool.size} browsers...")
+
+    def scrape(account):
+        with pool.driver() as driver:
+            print(f"[{account.name}] Scraping timeline...")
+            return scrape_account(driver, account)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = {executor.submit(scrape, account): account for account in accounts}
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                results[account.name] = future.result()
+                print(f"[{account.name}] Scraped {len(results[account.name])} tweets.")
+            except Exception as e:
+                print(f"[{account.name}] Scraping failed: {e}")
+    return {
+        account.name: results[account.name]
+        for account in accounts
+        if account.name in results
+    }
+
+
+def merge_account_tweets(results):
+    """Combines per-account tweets, deduplicated by link.
+
+    Each tweet lists the accounts whose timeline it appeared on in `accounts`.
+    """
+    merged = {}
+    for name, tweets in results.items():
+        for tweet in tweets:
+            if tweet["link"] not in merged:
+                merged[tweet["link"]] = dict(tweet, accounts=[])
+            merged[tweet["link"]]["accounts"].append(name)
+    return list(merged.values())
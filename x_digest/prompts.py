@@ -0,0 +1,89 @@
+"""Gemini prompts for the digest."""
+
+import re
+
+# Bump whenever the prompt wording changes so cached responses are not reused
+PROMPT_VERSION = 1
+SCORE_LINE_PATTERN = re.compile(
+    r"^\W*(?:tweet\s*)?(\d+)\W*[:=\-]\s*(\d+(?:\.\d+)?)", re.IGNORECASE | re.MULTILINE
+)
+
+
+def format_tweet_blob(tweets):
+    """Formats tweets as the numbered plain-text list embedded in the prompt."""
+    tweet_blob = ""
+    for i, tweet in enumerate(tweets):
+        tweet_blob += f"Tweet {i + 1}:\n"
+        tweet_blob += f"Author: {tweet['author']} ({tweet['handle']})\n"
+        tweet_blob += f"Text: {tweet['text']}\n"
+        tweet_blob += f"Link: {tweet['link']}\n\n"
+    return tweet_blob
+
+
+def build_digest_prompt(tweets):
+    """Builds the prompt asking Gemini for the categorized digest of tweets."""
+    tweet_blob = format_tweet_blob(tweets)
+
+    return f"""hey, i have a bunch of tweets from my timeline that i've scraped very recently. could you pick the best 15 tweets that i would find interesting and give me a personalized daily "digest"? analyze these tweets and create a digest with the following EXACT format requirements:
+
+1. start immediately with the first category (no introductory text)
+2. use exactly these category headers in this order (skip any that have no relevant tweets):
+   ### technology & science (ai/llms/biomed/quantum/space/real breakthroughs)
+   ### world news (geopolitics, politics, u.s. news)
+   ### finance & economics
+   ### noteworthy 
+
+3. under each category, list relevant tweets in this exact format (no numbers, they will be added automatically):
+   @handle: [1-2 sentence summary] → <a href="[tweet url]" class="tweet-link">view on X</a>
+
+4. do not include any other text, headers, or formatting
+
+example of the exact format:
+### technology & science
+@handle: summary of the tweet goes here → <a href="https://x.com/status/123" class="tweet-link">view on X</a>
+@another: another summary here → <a href="https://x.com/status/456" class="tweet-link">view on X</a>
+
+### us news & politics
+@handle: political summary here → <a href="https://x.com/status/789" class="tweet-link">view on X</a>
+
+now, here are the tweets to analyze:
+
+--- START OF TWEETS ---
+{tweet_blob}
+--- END OF TWEETS ---
+
+now, generate the digest using the tweets above, making it feel conversational – complete sentences, natural flow, occasional wry commentary where appropriate. use lower cases. remember: start directly with "### Technology & Science" - no other text before it.
+<final_digest>
+"""
+
+
+def extract_final_digest(response_text):
+    """Returns the digest from a Gemini response, dropping anything before <final_digest>."""
+    if "<final_digest>" in response_text:
+        response_text = response_text.split("<final_digest>")[1].strip()
+    return response_text
+
+
+def build_scoring_prompt(tweets):
+    """Builds the map-stage prompt asking Gemini to score a batch of tweets."""
+    tweet_blob = format_tweet_blob(tweets)
+
+    return f"""rate each of these tweets from my timeline for how much i'd want it in my daily digest, from 0 (skip it) to 10 (must read). i care most about technology & science (ai/llms/biomed/quantum/space/real breakthroughs), world news, finance & economics, and anything genuinely noteworthy. low-effort posts, ads and engagement bait score low.
+
+reply with exactly one line per tweet and nothing else, in this format:
+<tweet number>: <score>
+
+--- START OF TWEETS ---
+{tweet_blob}
+--- END OF TWEETS ---
+"""
+
+
+def parse_scores(response_text, tweet_count):
+    """Returns {tweet index: score} from a scoring response, ignoring unknown numbers."""
+    scores = {}
+    for match in SCORE_LINE_PATTERN.finditer(response_text):
+        index = int(match.group(1)) - 1
+        if 0 <= index < tweet_count:
+            scores[index] = float(match.group(2))
+    return scores
@@ -0,0 +1,130 @@
+"""Cheap local scoring that trims the tweet set before it reaches Gemini."""
+
+import json
+import math
+import re
+import time
+from datetime import datetime, timezone
+
+# Keywords for the digest's categories; each distinct hit adds to the score
+CATEGORY_KEYWORDS = {
+    "technology & science": (
+        "ai|llm|llms|gpt|model|models|openai|anthropic|deepmind|gemini|nvidia|gpu|"
+        "chip|chips|robot|robotics|quantum|space|spacex|nasa|rocket|launch|biotech|"
+        "protein|cancer|vaccine|gene|crispr|paper|research|breakthrough|"
+        "open source|benchmark|startup|software"
+    ),
+    "world news": (
+        "election|president|congress|senate|supreme court|minister|government|war|"
+        "ceasefire|sanctions|ukraine|russia|china|israel|gaza|iran|nato|tariff|"
+        "tariffs|policy|bill|white house|treaty|protest"
+    ),
+    "finance & economics": (
+        "fed|rates|inflation|cpi|gdp|recession|jobs report|earnings|revenue|ipo|"
+        "stocks|stock|market|markets|s&p|nasdaq|bond|bonds|treasury|yield|bitcoin|"
+        "crypto|valuation|funding|raised|acquisition|economy"
+    ),
+}
+CATEGORY_PATTERNS = {
+    category: re.compile(
+        r"(?<![\w$])("
+        + "|".join(re.escape(keyword) for keyword in keywords.split("|"))
+        + r")(?!\w)",
+        re.IGNORECASE,
+    )
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+LOW_VALUE_PATTERN = re.compile(
+    r"giveaway|follow (me|us|back)|like (and|&) (rt|retweet)|link in bio|dm me|"
+    r"gm\b|good morning",
+    re.IGNORECASE,
+)
+
+CATEGORY_HIT_WEIGHT = 1.0
+MAX_CATEGORY_HITS = 3
+SHORT_TEXT_CHARS = 40  # Shorter tweets rarely carry enough to summarize
+ENGAGEMENT_WEIGHT = 0.4
+CLUSTER_WEIGHT = 1.0  # Per doubling of accounts posting the same story
+RECENCY_WEIGHT = 1.5
+RECENCY_HALF_LIFE = 12 * 3600  # Seconds
+
+
+def load_author_weights(path):
+    """Loads {"@handle": weight} from a JSON file; missing file means no weights."""
+    try:
+        with open(path) as f:
+            weights = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {handle.lower(): float(weight) for handle, weight in weights.items()}
+
+
+def classify_tweet(text):
+    """Returns (best category or None, number of distinct keyword hits for it)."""
+    best_category = None
+    best_hits = 0
+    for category, pattern in CATEGORY_PATTERNS.items():
+        hits = len({match.lower() for match in pattern.findall(text)})
+        if hits > best_hits:
+            best_category, best_hits = category, hits
+    return best_category, best_hits
+
+
+def _engagement(metrics):
+    """Log-scaled engagement; replies and quotes signal more than likes."""
+    if not metrics:
+        return 0.0
+    interactions = (
+        metrics.get("likes", 0)
+        + 2 * metrics.get("retweets", 0)
+        + 3 * metrics.get("quotes", 0)
+        + metrics.get("replies", 0)
+        + metrics.get("bookmarks", 0)
+    )
+    return math.log10(1 + interactions + metrics.get("views", 0) / 100)
+
+
+def _age_seconds(tweeted_at, now):
+    """Seconds since an ISO timestamp like 2025-01-01T12:00:00.000Z, or None."""
+    if not tweeted_at:
+        return None
+    try:
+        parsed = datetime.strptime(tweeted_at[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return None
+    return max(0.0, now - parsed.replace(tzinfo=timezone.utc).timestamp())
+
+
+def score_tweet(tweet, author_weights, now):
+    """Scores a tweet from its text, author, engagement, duplicates and age."""
+    text = tweet["text"]
+    _, hits = classify_tweet(text)
+    score = CATEGORY_HIT_WEIGHT * min(hits, MAX_CATEGORY_HITS)
+
+    if len(text) < SHORT_TEXT_CHARS:
+        score -= 0.5
+    if LOW_VALUE_PATTERN.search(text):
+        score -= 2.0
+
+    score += author_weights.get(tweet["handle"].lower(), 0.0)
+    score += ENGAGEMENT_WEIGHT * _engagement(tweet.get("metrics"))
+    score += CLUSTER_WEIGHT * math.log2(tweet.get("cluster_size", 1))
+
+    age = _age_seconds(tweet.get("time"), now)
+    if age is not None:
+        score += RECENCY_WEIGHT * 0.5 ** (age / RECENCY_HALF_LIFE)
+    return score
+
+
+def prerank_tweets(tweets, top_n, author_weights=None, now=None):
+    """Returns the top_n highest-scoring tweets, kept in timeline order."""
+    if top_n <= 0 or len(tweets) <= top_n:
+        return tweets
+    author_weights = author_weights or {}
+    now = now or time.time()
+
+    scores = [score_tweet(tweet, author_weights, now) for tweet in tweets]
+    ranked = sorted(range(len(tweets)), key=lambda i: scores[i], reverse=True)
+    kept = sorted(ranked[:top_n])
+    print(f"Pre-ranked {len(tweets)} tweets locally, forwarding the top {top_n}.")
+    return [tweets[i] for i in kept]
@@ -0,0 +1,46 @@
+"""Exponential backoff for calls to rate-limited APIs (Gemini and Resend)."""
+
+import random
+import time
+
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+}
+
+
+def is_retryable(error):
+    """True for rate limiting and transient server errors."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        code = None
+    if code is not None and (code == 429 or 500 <= code < 600):
+        return True
+    message = str(error)
+    return (
+        type(error).__name__ in RETRYABLE_ERROR_NAMES
+        or "429" in message
+        or "rate limit" in message.lower()
+    )
+
+
+def call_with_retries(call, label, max_retries, base_delay):
+    """Returns call(), backing off exponentially (with jitter) on retryable errors.
+
+    label names the service in the retry message; base_delay is in seconds and
+    doubled on every retry.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = base_delay * 2**attempt * random.uniform(0.8, 1.2)
+            print(f"{label} busy ({e}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
@@ -0,0 +1,195 @@
+"""Long-running scheduler that triggers digest runs on a cron-like schedule.
+
+Keeping the process alive means imports, the Gemini client and (optionally)
+a warm browser are set up once instead of on every cron invocation. Runs never
+overlap: a fire time that arrives while a run is still going is skipped, and a
+lock file keeps other processes using the same state file out as well. The last
+scheduled time is saved, so after downtime the missed-run policy decides
+whether to catch up with one immediate run ("once") or wait for the next
+slot ("skip").
+"""
+
+import fcntl
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+# (low, high) of each cron field: minute, hour, day of month, month, day of week
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+MISSED_RUN_POLICIES = ("once", "skip")
+MAX_SLEEP = 30  # Seconds; short naps keep Ctrl+C and clock changes responsive
+
+
+def _parse_cron_field(field, low, high):
+    """Returns the set of values a cron field (e.g. "*/15", "1-5", "0,30") allows."""
+    values = set()
+    for part in field.split(","):
+        value_range, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if value_range == "*":
+            start, end = low, high
+        elif "-" in value_range:
+            start, end = (int(value) for value in value_range.split("-", 1))
+        else:
+            start = int(value_range)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"invalid cron field {field!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A standard 5-field cron expression (minute hour day month weekday)."""
+
+    def __init__(self, expression):
+        self.expression = CRON_ALIASES.get(expression.strip(), expression)
+        fields = self.expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expression!r}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(field, low, high)
+            for field, (low, high) in zip(fields, CRON_FIELDS)
+        )
+        # Like cron, 7 also means Sunday; restricting both day fields matches either
+        if 7 in self.weekdays:
+            self.weekdays.add(0)
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """Returns the first matching minute strictly after moment."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron expression never fires: {self.expression!r}")
+
+
+class Scheduler:
+    """Calls run_digest() at every fire time of schedule, one run at a time."""
+
+    def __init__(self, schedule, run_digest, state_file, jitter=0, missed="once"):
+        if missed not in MISSED_RUN_POLICIES:
+            raise ValueError(f"missed-run policy must be one of {MISSED_RUN_POLICIES}")
+        self.schedule = schedule
+        self.run_digest = run_digest
+        self.state_file = state_file
+        self.jitter = jitter
+        self.missed = missed
+        self.state = self._load_state()
+        self._running = threading.Lock()
+        self._state_lock = threading.Lock()  # State is written from the run thread too
+
+    def _load_state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, **changes):
+        with self._state_lock:
+            self.state.update(changes)
+            temp_path = self.state_file + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(temp_path, self.state_file)
+
+    def _missed_slot(self, now):
+        """Returns the latest fire time missed since the last scheduled run, if any."""
+        last = self.state.get("last_scheduled")
+        if not last:
+            return None
+        missed = None
+        slot = self.schedule.next_after(datetime.fromtimestamp(last))
+        while slot <= now:
+            missed = slot
+            slot = self.schedule.next_after(slot)
+        return missed
+
+    def _run(self, slot):
+        """Runs one digest in the background thread, holding the cross-process lock."""
+        try:
+            with open(self.state_file + ".lock", "w") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    print("Another digest run holds the lock, skipping this slot.")
+                    return
+                started = time.time()
+                self._save_state(last_started=started)
+                print(f"\n=== Scheduled digest run for {slot:%Y-%m-%d %H:%M} ===")
+                status = "ok"
+                try:
+                    self.run_digest()
+                except Exception as e:
+                    status = f"error: {e}"
+                    print(f"Scheduled run failed: {e}")
+                self._save_state(
+                    last_finished=time.time(),
+                    last_status=status,
+                    last_duration=round(time.time() - started, 1),
+                )
+        finally:
+            self._running.release()
+
+    def _start(self, slot):
+        """Starts a run for slot unless the previous one is still going."""
+        self._save_state(last_scheduled=slot.timestamp())
+        if not self._running.acquire(blocking=False):
+            print(f"Previous run still in progress, skipping {slot:%H:%M}.")
+            return
+        threading.Thread(target=self._run, args=(slot,), daemon=True).start()
+
+    def run_forever(self):
+        """Sleeps until each fire time (plus jitter) and starts the run."""
+        print(f"Scheduler started with schedule {self.schedule.expression!r}.")
+        now = datetime.now()
+        missed = self._missed_slot(now)
+        if missed:
+            if self.missed == "once":
+                print(f"Catching up on the run missed at {missed:%Y-%m-%d %H:%M}.")
+                self._start(missed)
+            else:
+                print(f"Skipping the run missed at {missed:%Y-%m-%d %H:%M}.")
+                self._save_state(last_scheduled=missed.timestamp())
+
+        try:
+            while True:
+                slot = self.schedule.next_after(datetime.now())
+                fire_at = slot.timestamp() + random.uniform(0, self.jitter)
+                print(
+                    f"Next digest run at {datetime.fromtimestamp(fire_at):%Y-%m-%d %H:%M:%S}."
+                )
+                while time.time() < fire_at:
+                    time.sleep(min(MAX_SLEEP, fire_at - time.time()))
+                self._start(slot)
+                # Never fire twice for one slot, however short the run
+                while datetime.now() < slot + timedelta(minutes=1):
+                    time.sleep(1)
+        except KeyboardInterrupt:
+            print("Scheduler stopped.")
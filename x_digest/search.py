@@ -0,0 +1,297 @@
+"""Full-text search over every scraped tweet and generated digest line.
+
+The index is a SQLite database with an FTS5 table, updated from each run's
+checkpoints when the run ends. Tweets that made it into a digest carry that
+digest's category, so they can be filtered on it too.
+
+    python -m x_digest.search "export controls"
+    python -m x_digest.search rates --handle @federalreserve --since 7d
+    python -m x_digest.search gpu* --category "AI" --since 2025-01-01 --until 2025-01-31
+    python -m x_digest.search --reindex runs      # index every existing run
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+from x_digest.archive import parse_tweet_time
+from x_digest.digest import parse_digest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,  -- tweet:<status ID> or digest:<run>:<line number>
+    kind TEXT NOT NULL,  -- "tweet" or "digest"
+    run TEXT NOT NULL,  -- Run (and account) directory the document came from
+    handle TEXT NOT NULL,  -- Lowercase, without the @
+    author TEXT NOT NULL,
+    category TEXT,  -- Digest category; for tweets, of the digest that linked them
+    link TEXT,
+    created REAL NOT NULL,  -- Tweet time, or when the digest was written
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_handle ON documents (handle, created);
+CREATE INDEX IF NOT EXISTS documents_created ON documents (created);
+CREATE INDEX IF NOT EXISTS documents_link ON documents (link);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    text, author, content='documents', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+-- Keep the full-text table in step with documents
+CREATE TRIGGER IF NOT EXISTS documents_insert AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, text, author)
+    VALUES (new.id, new.text, new.author);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_delete AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, text, author)
+    VALUES ('delete', old.id, old.text, old.author);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_update AFTER UPDATE OF text, author
+ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, text, author)
+    VALUES ('delete', old.id, old.text, old.author);
+    INSERT INTO documents_fts (rowid, text, author)
+    VALUES (new.id, new.text, new.author);
+END;
+"""
+TWEETS_CHECKPOINT = "tweets.json"
+DIGEST_CHECKPOINT = "digest.txt"
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def normalize_handle(handle):
+    """Lowercases a handle and drops the @, so @Name and name match."""
+    return (handle or "").lstrip("@").lower()
+
+
+def fts_query(text):
+    """Turns free text into an FTS5 query matching every word (word* for prefixes)."""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def parse_date(text, end=False):
+    """Parses YYYY-MM-DD (UTC) or Nd (N days ago) into epoch seconds.
+
+    With end, a YYYY-MM-DD date means the end of that day.
+    """
+    if text.endswith("d") and text[:-1].isdigit():
+        return time.time() - int(text[:-1]) * 86400
+    day = datetime.strptime(text, DATE_FORMAT).replace(tzinfo=timezone.utc)
+    if end:
+        day += timedelta(days=1)
+    return day.timestamp()
+
+
+class SearchIndex:
+    """The search database; add_* calls are incremental and safe to repeat."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def add_tweets(self, tweets, run, seen_at=None):
+        """Indexes tweets not indexed before; returns how many were new."""
+        seen_at = seen_at or time.time()
+        rows = []
+        for tweet in tweets:
+            if not tweet.get("id"):
+                continue
+            tweeted_at = parse_tweet_time(tweet.get("time"))
+            rows.append(
+                (
+                    f"tweet:{tweet['id']}",
+                    run,
+                    normalize_handle(tweet["handle"]),
+                    tweet["author"],
+                    tweet["link"],
+                    tweeted_at / 1000 if tweeted_at is not None else seen_at,
+                    tweet["text"],
+                )
+            )
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO documents "
+                "(key, kind, run, handle, author, link, created, text) "
+                "VALUES (?, 'tweet', ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self.conn.total_changes - before
+
+    def add_digest(self, digest_text, run, written_at=None):
+        """Indexes a digest's lines (replacing the run's earlier ones) and tags the
+        tweets it links with their category; returns the number of lines."""
+        written_at = written_at or time.time()
+        digest = parse_digest(digest_text)
+        rows = []
+        for note in digest.intro:
+            rows.append(("", None, None, note))
+        for category in digest.categories:
+            for item in category.items:
+                rows.append((item.handle, category.title, item.link, item.summary))
+            for note in category.notes:
+                rows.append(("", category.title, None, note.text))
+
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM documents WHERE kind = 'digest' AND run = ?", (run,)
+            )
+            self.conn.executemany(
+                "INSERT INTO documents "
+                "(key, kind, run, handle, author, category, link, created, text) "
+                "VALUES (?, 'digest', ?, ?, '', ?, ?, ?, ?)",
+                [
+                    (
+                        f"digest:{run}:{number}",
+                        run,
+                        normalize_handle(handle),
+                        category,
+                        link,
+                        written_at,
+                        text,
+                    )
+                    for number, (handle, category, link, text) in enumerate(rows)
+                ],
+            )
+            self.conn.executemany(
+                "UPDATE documents SET category = ? WHERE kind = 'tweet' AND link = ?",
+                [(category, link) for _, category, link, _ in rows if link],
+            )
+        return len(rows)
+
+    def search(
+        self,
+        text=None,
+        handle=None,
+        since=None,
+        until=None,
+        category=None,
+        kind=None,
+        limit=20,
+    ):
+        """Returns matching documents as dicts, best match (or newest) first."""
+        query = fts_query(text or "")
+        conditions = []
+        params = []
+        if query:
+            conditions.append("documents_fts MATCH ?")
+            params.append(query)
+        if handle:
+            conditions.append("d.handle = ?")
+            params.append(normalize_handle(handle))
+        if since is not None:
+            conditions.append("d.created >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("d.created < ?")
+            params.append(until)
+        if category:
+            conditions.append("d.category LIKE ?")
+            params.append(f"%{category}%")
+        if kind:
+            conditions.append("d.kind = ?")
+            params.append(kind)
+
+        if query:
+            source = "documents_fts JOIN documents d ON d.id = documents_fts.rowid"
+            snippet = "snippet(documents_fts, 0, '[', ']', '…', 16)"
+            order = "rank"
+        else:
+            source = "documents d"
+            snippet = "d.text"
+            order = "d.created DESC"
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.conn.execute(
+            f"SELECT d.kind, d.run, d.handle, d.author, d.category, d.link, "
+            f"d.created, {snippet} FROM {source} {where} ORDER BY {order} LIMIT ?",
+            params + [limit],
+        )
+        columns = ("kind", "run", "handle", "author", "category", "link")
+        columns += ("created", "snippet")
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def close(self):
+        """Closes the database connection."""
+        self.conn.close()
+
+
+def index_run(index, runs_dir, run_directory):
+    """Indexes a run's tweet and digest checkpoints, including per-account sub-runs.
+
+    Tweets go in before digests, so the digests can tag them with categories.
+    """
+    for directory, _, files in sorted(os.walk(run_directory)):
+        run = os.path.relpath(directory, runs_dir)
+        if TWEETS_CHECKPOINT in files:
+            path = os.path.join(directory, TWEETS_CHECKPOINT)
+            with open(path, encoding="utf-8") as f:
+                index.add_tweets(json.load(f), run, os.path.getmtime(path))
+    for directory, _, files in sorted(os.walk(run_directory)):
+        run = os.path.relpath(directory, runs_dir)
+        if DIGEST_CHECKPOINT in files:
+            path = os.path.join(directory, DIGEST_CHECKPOINT)
+            with open(path, encoding="utf-8") as f:
+                index.add_digest(f.read(), run, os.path.getmtime(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Search archived tweets and digest lines."
+    )
+    parser.add_argument("query", nargs="*", help="words to match (word* for prefixes)")
+    parser.add_argument("--handle", help="only this account (@name or name)")
+    parser.add_argument("--since", help="YYYY-MM-DD or Nd (N days ago)")
+    parser.add_argument("--until", help="YYYY-MM-DD (inclusive) or Nd")
+    parser.add_argument("--category", help="digest category (substring)")
+    parser.add_argument("--kind", choices=("tweet", "digest"))
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument(
+        "--index", default=os.getenv("SEARCH_INDEX_PATH") or "search.db"
+    )
+    parser.add_argument(
+        "--reindex",
+        metavar="RUNS_DIR",
+        help="index every run in RUNS_DIR first (e.g. after enabling the index)",
+    )
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    if args.reindex:
+        for name in sorted(os.listdir(args.reindex)):
+            if os.path.isdir(os.path.join(args.reindex, name)):
+                index_run(index, args.reindex, os.path.join(args.reindex, name))
+        print(f"Indexed the runs in {args.reindex}.")
+        if not (args.query or args.handle or args.category):
+            exit()
+
+    results = index.search(
+        " ".join(args.query) or None,
+        handle=args.handle,
+        since=parse_date(args.since) if args.since else None,
+        until=parse_date(args.until, end=True) if args.until else None,
+        category=args.category,
+        kind=args.kind,
+        limit=args.limit,
+    )
+    for result in results:
+        when = datetime.fromtimestamp(result["created"]).strftime("%Y-%m-%d %H:%M")
+        who = f"@{result['handle']}" if result["handle"] else result["kind"]
+        category = f" [{result['category']}]" if result["category"] else ""
+        print(f"{when}  {who}{category}  ({result['kind']}, run {result['run']})")
+        print(f"    {result['snippet']}")
+        if result["link"]:
+            print(f"    {result['link']}")
+    if not results:
+        print("No matches.")
+    index.close()
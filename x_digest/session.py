@@ -0,0 +1,92 @@
+"""Persistence of the logged-in X session between runs."""
+
+import json
+import os
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+# Any cheap page on x.com works: cookies and localStorage can only be set for the
+# origin the browser is on, and this avoids booting the full web app twice.
+X_ORIGIN_URL = "https://x.com/robots.txt"
+AUTH_COOKIE = "auth_token"  # Present only while logged in
+
+
+def save_session(driver, path):
+    """Saves the cookies and localStorage of the current X session to path."""
+    state = {
+        "saved_at": time.time(),
+        "cookies": driver.get_cookies(),
+        "local_storage": driver.execute_script(
+            "return Object.assign({}, window.localStorage);"
+        ),
+    }
+    # The file holds live auth tokens, so keep it private to the current user
+    temp_path = f"{path}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+    print(f"Saved X session to {path}.")
+
+
+def _load_session(driver, path):
+    """Injects cookies and localStorage saved by save_session into the browser."""
+    with open(path) as f:
+        state = json.load(f)
+
+    for cookie in state.get("cookies", []):
+        if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+            cookie.pop("sameSite", None)
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            print(f"Skipping saved cookie {cookie.get('name')}: {e}")
+
+    driver.execute_script(
+        "for (const [key, value] of Object.entries(arguments[0])) {"
+        " window.localStorage.setItem(key, value); }",
+        state.get("local_storage", {}),
+    )
+
+
+def restore_session(driver, path, home_url, timeout):
+    """Restores a saved (or Chrome profile) session; returns True if it is still valid.
+
+    The auth cookie is checked before loading the timeline, so a missing or
+    logged-out session fails in well under a second instead of waiting on X.
+    """
+    driver.get(X_ORIGIN_URL)
+    if path and os.path.exists(path):
+        try:
+            _load_session(driver, path)
+        except (OSError, ValueError) as e:
+            print(f"Could not read saved session {path}: {e}")
+
+    if not driver.get_cookie(AUTH_COOKIE):
+        print("No saved X session found.")
+        return False
+
+    print("Validating saved X session...")
+    driver.get(home_url)
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located(
+                (By.CSS_SELECTOR, 'div[aria-label*="Timeline"]')
+            )
+        )
+    except TimeoutException:
+        print("Saved X session has expired.")
+        driver.delete_all_cookies()
+        return False
+    return True
+
+
+def clear_session(driver):
+    """Logs the browser out of X by dropping its cookies and storage."""
+    driver.get(X_ORIGIN_URL)
+    driver.delete_all_cookies()
+    driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
@@ -0,0 +1,120 @@
+"""Local SQLite store of scraped tweets for deduplication across runs."""
+
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id INTEGER PRIMARY KEY,  -- status ID
+    handle TEXT NOT NULL,
+    author TEXT NOT NULL,
+    text TEXT NOT NULL,
+    link TEXT NOT NULL,
+    tweeted_at TEXT,
+    first_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tweets_first_seen ON tweets (first_seen);
+-- Which digest each tweet went out in: "" for the combined digest, otherwise
+-- the account of a per-account digest (ACCOUNT_DIGESTS=separate)
+CREATE TABLE IF NOT EXISTS digested (
+    id INTEGER NOT NULL,  -- status ID
+    account TEXT NOT NULL,
+    digested_at REAL NOT NULL,
+    PRIMARY KEY (id, account)
+);
+"""
+SQLITE_MAX_VARIABLES = 900  # Stay under SQLite's default bound-parameter limit
+
+
+class TweetStore:
+    """Tweets keyed by status ID, with when they were first seen and digested.
+
+    Safe to share between threads; every statement runs under one lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Moves tweets.digested_at of older stores into the digested table."""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tweets)")]
+        if "digested_at" not in columns:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO digested (id, account, digested_at) "
+                "SELECT id, '', digested_at FROM tweets WHERE digested_at IS NOT NULL"
+            )
+            self.conn.execute(
+                "UPDATE tweets SET digested_at = NULL WHERE digested_at IS NOT NULL"
+            )
+            self.conn.execute("DROP INDEX IF EXISTS tweets_digested_at")
+
+    def add(self, tweets):
+        """Records tweets not seen before; returns how many were new."""
+        now = time.time()
+        rows = [
+            (
+                int(tweet["id"]),
+                tweet["handle"],
+                tweet["author"],
+                tweet["text"],
+                tweet["link"],
+                tweet.get("time"),
+                now,
+            )
+            for tweet in tweets
+            if tweet.get("id")
+        ]
+        with self.lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tweets "
+                "(id, handle, author, text, link, tweeted_at, first_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self.conn.total_changes - before
+
+    def digested_ids(self, ids, account=""):
+        """Returns the subset of status IDs that already went out in account's digest."""
+        ids = [int(status_id) for status_id in ids if status_id]
+        digested = set()
+        with self.lock:
+            for start in range(0, len(ids), SQLITE_MAX_VARIABLES):
+                chunk = ids[start : start + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                digested.update(
+                    str(row[0])
+                    for row in self.conn.execute(
+                        f"SELECT id FROM digested WHERE account = ? "
+                        f"AND id IN ({placeholders})",
+                        [account] + chunk,
+                    )
+                )
+        return digested
+
+    def mark_digested(self, tweets, account=""):
+        """Marks tweets as sent in account's digest so its later runs skip them."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO digested (id, account, digested_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (int(tweet["id"]), account, now)
+                    for tweet in tweets
+                    if tweet.get("id")
+                ],
+            )
+
+    def close(self):
+        """Closes the database connection."""
+        with self.lock:
+            self.conn.close()
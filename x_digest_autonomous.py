@@ -1,10 +1,11 @@
+import argparse
+import json
 import os
+import threading
 import time
-import re
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
@@ -13,11 +14,60 @@ from selenium.webdriver.common.keys import Keys
 
 # Import common exceptions
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 import google.generativeai as genai
 import resend
 
+from x_digest.browser import (
+    apply_lean_profile,
+    attach_driver,
+    block_heavy_resources,
+    report_memory_usage,
+    start_chrome,
+)
+from x_digest.daemon import BrowserDaemon, acquire_warm_browser, send_daemon_command
+from x_digest.dedupe import collapse_near_duplicates
+from x_digest.delivery import (
+    Recipient,
+    build_messages,
+    deliver_messages,
+    load_recipients,
+)
+from x_digest.digest import (
+    StreamingDigestFormatter,
+    parse_digest,
+    render_digest_body,
+    render_email,
+)
+from x_digest.extract import (
+    drain_timeline_observer,
+    extract_new_tweets,
+    install_timeline_observer,
+    parse_tweets_from_html,
+    resolve_html_parser,
+)
+from x_digest.graphql import TimelineCapture, enable_network_capture
+from x_digest.llm_cache import ResponseCache, digest_cache_key
+from x_digest.mapreduce import map_reduce_digest
+from x_digest.archive import Archive
+from x_digest.bench import FixtureRecorder
+from x_digest.metrics import Metrics
+from x_digest.outbox import Outbox
+from x_digest.pacing import ScrollPacer
+from x_digest.parse_workers import ParsedSnapshots, ParsePool
+from x_digest.pool import (
+    BrowserPool,
+    load_accounts,
+    merge_account_tweets,
+    scrape_accounts,
+)
+from x_digest.pipeline import PipelineRun, Stage, latest_run_id, new_run_id
+from x_digest.scheduler import CronSchedule, Scheduler
+from x_digest.search import SearchIndex, index_run
+from x_digest.ranking import load_author_weights, prerank_tweets
+from x_digest.prompts import PROMPT_VERSION, build_digest_prompt, extract_final_digest
+from x_digest.session import clear_session, restore_session, save_session
+from x_digest.store import TweetStore
+
 # --- Configuration ---
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -46,41 +96,152 @@ if not all(
 
 # Configure Gemini
 genai.configure(api_key=GEMINI_API_KEY)
-# gemini_model = genai.GenerativeModel("gemini-2.0-flash") # great for longer amounts of tweets analyzed + faster responses
-gemini_model = genai.GenerativeModel("gemini-2.5-pro-exp-03-25")
+# GEMINI_MODEL_NAME = "gemini-2.0-flash" # great for longer amounts of tweets analyzed + faster responses
+GEMINI_MODEL_NAME = "gemini-2.5-pro-exp-03-25"
+gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+# Map-reduce for large tweet sets: batches are scored concurrently (optionally by a
+# faster model), then the best-scoring tweets go through the regular digest prompt
+DIGEST_MODE = os.getenv("DIGEST_MODE", "auto")  # "single", "chunked" or "auto"
+MAP_REDUCE_MIN_TWEETS = 80  # "auto" switches to chunked above this many tweets
+GEMINI_MAP_MODEL_NAME = os.getenv("GEMINI_MAP_MODEL_NAME", GEMINI_MODEL_NAME)
+LLM_CHUNK_TOKENS = 6000  # Approximate prompt tokens of tweets per scoring batch
+LLM_CONCURRENCY = 4  # Scoring requests in flight at once
+REDUCE_SHORTLIST_SIZE = 40  # Tweets passed to the final digest call
+gemini_map_model = genai.GenerativeModel(GEMINI_MAP_MODEL_NAME)
+# Stream the digest and render its HTML line by line while Gemini is still writing
+STREAM_DIGEST = os.getenv("STREAM_DIGEST", "1") == "1"
+
+# Cache of generated digests (empty LLM_CACHE_DIR disables it)
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+LLM_CACHE_TTL = 7 * 24 * 3600  # Seconds a cached digest stays valid
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+llm_cache = (
+    ResponseCache(LLM_CACHE_DIR, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+    if LLM_CACHE_DIR
+    else None
+)
 
 # Configure Resend
 resend.api_key = RESEND_API_KEY
+# Team digests: when this JSON list of recipients (each with optional category
+# preferences) exists, it replaces RECIPIENT_EMAIL
+RECIPIENTS_FILE = os.getenv("RECIPIENTS_FILE", "recipients.json")
+DELIVERY_CONCURRENCY = 2  # Batch requests in flight; Resend allows 2 per second
+# Rendered emails are saved here before sending and retried until delivered
+# (empty OUTBOX_DIR sends directly, as before)
+OUTBOX_DIR = os.getenv("OUTBOX_DIR", ".outbox")
+outbox = Outbox(OUTBOX_DIR) if OUTBOX_DIR else None
 
 # --- Constants ---
+RUNS_DIR = os.getenv("RUNS_DIR", "runs")  # Per-run stage checkpoints
+# Every run's scraped tweets are appended here for later analysis (empty
+# disables); "auto" format is Parquet with pyarrow, else a built-in one
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_FORMAT = os.getenv("ARCHIVE_FORMAT", "auto")
+archive = Archive(ARCHIVE_DIR, ARCHIVE_FORMAT) if ARCHIVE_DIR else None
+# Full-text index of scraped tweets and digest lines, updated after every run
+# (python -m x_digest.search; empty disables)
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search.db")
+# Timings and counters of every run as JSON lines (empty disables), plus an optional
+# Prometheus text file with the aggregates of the latest run
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics.jsonl")
+PROMETHEUS_FILE = os.getenv("PROMETHEUS_FILE")
+metrics = Metrics(METRICS_FILE or None, PROMETHEUS_FILE)
+# Saves every scroll's page_source and Gemini response here for offline replay
+# with python -m x_digest.bench
+RECORD_DIR = os.getenv("RECORD_DIR")
+recorder = FixtureRecorder(RECORD_DIR) if RECORD_DIR else None
+# Scheduler mode (--schedule): cron expression, random delay added to each run,
+# and whether a run missed while the scheduler was down is made up ("once") or not
+DIGEST_SCHEDULE = os.getenv("DIGEST_SCHEDULE")
+SCHEDULE_JITTER = int(os.getenv("SCHEDULE_JITTER", "120"))  # Seconds
+MISSED_RUN_POLICY = os.getenv("MISSED_RUN_POLICY", "once")
+SCHEDULE_STATE_FILE = os.getenv("SCHEDULE_STATE_FILE", ".scheduler_state.json")
+# Keep a warm, logged-in browser in the scheduler process between runs
+SCHEDULE_WARM_BROWSER = os.getenv("SCHEDULE_WARM_BROWSER", "1") == "1"
+PIPELINE_STAGES = ("scrape", "digest", "html", "send")
 X_LOGIN_URL = "https://x.com/login"
 X_HOME_URL = "https://x.com/home"
-SCROLL_PAUSE_TIME = 4  # Seconds to wait between scrolls
-NUM_SCROLLS = 10  # How many times to scroll down the timeline
-TARGET_TWEET_COUNT = 50
-TWEET_SELECTOR = 'article[data-testid="tweet"]'  # Main selector for tweet elements
+# "adaptive" returns as soon as new tweets load; "fixed" always sleeps SCROLL_PAUSE_TIME
+SCROLL_PACING = os.getenv("SCROLL_PACING", "adaptive")
+SCROLL_PAUSE_TIME = 4  # Seconds to wait between scrolls (adaptive: initial max wait)
+SCROLL_MAX_PAUSE_TIME = 12  # Adaptive wait ceiling when X is slow to load
+NUM_SCROLLS = int(os.getenv("NUM_SCROLLS", "10"))  # Times to scroll down the timeline
+TARGET_TWEET_COUNT = int(os.getenv("TARGET_TWEET_COUNT", "50"))
+# SQLite store of seen/digested tweets; an empty path disables it
+TWEET_STORE_PATH = os.getenv("TWEET_STORE_PATH", "tweets.db")
+# Jaccard similarity above which tweets count as the same story (0 disables)
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.6"))
+PRERANK_TOP_N = int(os.getenv("PRERANK_TOP_N", "0"))  # 0 sends every tweet to Gemini
+AUTHOR_WEIGHTS_FILE = os.getenv("AUTHOR_WEIGHTS_FILE", "author_weights.json")
+KNOWN_TWEET_STOP_STREAK = 10  # Stop after this many already-digested tweets in a row
+# "dom" re-parses page_source each scroll, "js" extracts only new articles in-page,
+# "observer" buffers articles in-page as X inserts them into the timeline,
+# "graphql" decodes X's own HomeTimeline API responses captured over CDP
+SCRAPE_MODE = os.getenv("SCRAPE_MODE", "dom")
+GRAPHQL_RECORD_DIR = os.getenv("GRAPHQL_RECORD_DIR")  # Save captured responses here
+# Parser for "dom" mode's page_source: "auto" picks selectolax or lxml when
+# installed, else BeautifulSoup (all give the same tweets)
+HTML_PARSER = resolve_html_parser(os.getenv("HTML_PARSER", "auto"))
+# Worker processes that parse page_source while the browser keeps scrolling
+# (0 parses in the scroll loop itself)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+SESSION_FILE = os.getenv("SESSION_FILE", ".x_session.json")  # Cookies/localStorage
+CHROME_PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR")  # Optional reusable Chrome profile
+SESSION_CHECK_TIMEOUT = 10  # Seconds to wait for the timeline with a restored session
+# "full" is a regular Chrome window; "lean" is headless with media/fonts/images blocked
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "full")
+DRIVER_CACHE_FILE = os.getenv("DRIVER_CACHE_FILE", ".chromedriver_cache.json")
+BROWSER_DAEMON_PORT = int(os.getenv("BROWSER_DAEMON_PORT", "47315"))  # Control socket
+# Token and debugging port of the running daemon, readable only by this user
+BROWSER_DAEMON_FILE = os.getenv("BROWSER_DAEMON_FILE", ".browser_daemon.json")
 LOGIN_WAIT_TIMEOUT = 20  # Seconds to wait for login elements
+# Multi-account mode: when this JSON list of X accounts exists, their timelines are
+# scraped concurrently instead of X_USERNAME's
+ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", "accounts.json")
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "3"))  # Browsers at once
+# "combined" digests every account's tweets together, "separate" one per account
+ACCOUNT_DIGESTS = os.getenv("ACCOUNT_DIGESTS", "combined")
 
 # --- Helper Functions ---
 
 
-def setup_driver():
-    """Initializes and returns a Selenium WebDriver instance."""
+def setup_driver(
+    remote_debugging_port=None, profile_dir=CHROME_PROFILE_DIR, exit_on_error=True
+):
+    """Initializes and returns a Selenium WebDriver instance.
+
+    Without exit_on_error a failure raises RuntimeError instead of exiting, so
+    one browser that fails to start does not end a multi-account scrape.
+    """
     options = webdriver.ChromeOptions()
-    # options.add_argument("--headless")  # Run headless later if needed
+    if BROWSER_PROFILE == "lean":
+        apply_lean_profile(options)  # Headless, no media/fonts, capped JS heap
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument(
         "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     )  # Mimic real browser
+    if profile_dir:
+        # Reusable profile: cookies and storage survive between runs natively
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    if SCRAPE_MODE == "graphql":
+        enable_network_capture(options)
+    if remote_debugging_port:
+        # Lets later runs attach to this browser (see --browser-daemon)
+        options.add_argument(f"--remote-debugging-port={remote_debugging_port}")
     try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = start_chrome(options, DRIVER_CACHE_FILE)
         driver.set_page_load_timeout(30)  # Wait up to 30 seconds for pages to load
+        if BROWSER_PROFILE == "lean":
+            block_heavy_resources(driver)
         return driver
     except Exception as e:
         print(f"Error setting up WebDriver: {e}")
         print("Please ensure Chrome is installed and webdriver-manager can access it.")
+        if not exit_on_error:
+            raise RuntimeError(f"Could not start Chrome: {e}") from e
         exit()
 
 
@@ -158,8 +319,53 @@ def login_to_x(driver, username, password):
         return False
 
 
-def scrape_tweets(driver):
-    """Scrolls the timeline and scrapes tweet data."""
+def ensure_logged_in(driver, account=None):
+    """Reuses the saved session while it is valid, otherwise logs in and saves it."""
+    if account:
+        session_file, username, password = (
+            account.session_file,
+            account.username,
+            account.password,
+        )
+    else:
+        session_file, username, password = SESSION_FILE, X_USERNAME, X_PASSWORD
+
+    with metrics.timer("session_restore_seconds"):
+        restored = restore_session(
+            driver, session_file, X_HOME_URL, SESSION_CHECK_TIMEOUT
+        )
+    if restored:
+        print("Restored saved X session, skipping login.")
+    else:
+        start = time.monotonic()
+        logged_in = login_to_x(driver, username, password)
+        metrics.record(
+            "login_seconds",
+            time.monotonic() - start,
+            status="ok" if logged_in else "error",
+        )
+        if not logged_in:
+            return False
+    save_session(driver, session_file)  # Keep rotated cookies fresh
+    return True
+
+
+def scrape_account(driver, account, store=None, parse_pool=None):
+    """Logs a pooled browser into one account and scrapes its timeline."""
+    if not ensure_logged_in(driver, account):
+        raise RuntimeError(f"Login failed for {account.name}.")
+    # Per-account digests each skip only the tweets they already sent
+    digest_account = account.name if ACCOUNT_DIGESTS == "separate" else ""
+    return scrape_tweets(driver, store, parse_pool, digest_account)
+
+
+def scrape_tweets(driver, store=None, parse_pool=None, digest_account=""):
+    """Scrolls the timeline and scrapes tweet data, skipping tweets already digested.
+
+    parse_pool, if given, parses page source snapshots in worker processes.
+    digest_account names the per-account digest to check against ("" for the
+    combined digest).
+    """
     # No need to navigate again if login was successful, but check current URL just in case
     if X_HOME_URL not in driver.current_url:
         print(f"Not on the home timeline. Navigating to {X_HOME_URL}...")
@@ -179,81 +385,138 @@ def scrape_tweets(driver):
     scraped_tweets_data = []
     last_height = driver.execute_script("return document.body.scrollHeight")
     tweet_elements_found = set()  # To avoid duplicates from dynamic loading
+    known_streak = 0  # Consecutive tweets that were already in an earlier digest
 
+    scrape_mode = SCRAPE_MODE
+    if scrape_mode == "observer" and not install_timeline_observer(driver):
+        print("Could not attach the timeline observer, falling back to DOM parsing.")
+        scrape_mode = "dom"
+
+    capture = None
+    if scrape_mode == "graphql":
+        try:
+            capture = TimelineCapture(driver, record_dir=GRAPHQL_RECORD_DIR)
+        except Exception as e:
+            print(
+                f"Could not start GraphQL capture ({e}), falling back to DOM parsing."
+            )
+            scrape_mode = "dom"
+    snapshots = None
+    if scrape_mode == "dom":
+        if parse_pool:
+            print(f"Parsing page source with {HTML_PARSER} in {PARSE_WORKERS} workers.")
+            snapshots = ParsedSnapshots(
+                parse_pool,
+                lambda seconds: metrics.record("worker_parse_seconds", seconds),
+            )
+        else:
+            print(f"Parsing page source with {HTML_PARSER}.")
+
+    def collect(tweet_candidates):
+        """Keeps the tweets not seen yet; returns True once scraping can stop."""
+        nonlocal known_streak
+        # Tweets that went out in an earlier digest are skipped entirely
+        digested_ids = (
+            store.digested_ids(
+                (tweet["id"] for tweet in tweet_candidates), digest_account
+            )
+            if store
+            else set()
+        )
+        new_tweets = []
+        for tweet in tweet_candidates:
+            # Use link as unique ID to avoid duplicates
+            if tweet["link"] in tweet_elements_found:
+                continue
+            tweet_elements_found.add(tweet["link"])
+            if tweet["id"] in digested_ids:
+                known_streak += 1
+                continue
+            known_streak = 0
+            new_tweets.append(tweet)
+            print(
+                f" Scraped: {tweet['handle'] or tweet['author']}: {tweet['text'][:50]}..."
+            )
+        scraped_tweets_data.extend(new_tweets)
+        metrics.record("tweets_per_scroll", len(new_tweets))
+        if store:
+            store.add(new_tweets)  # Write through so a crashed run still counts
+
+        print(f"Total unique tweets scraped so far: {len(scraped_tweets_data)}")
+        if len(scraped_tweets_data) >= TARGET_TWEET_COUNT:
+            print("Reached target number of tweets.")
+            return True
+        if KNOWN_TWEET_STOP_STREAK and known_streak >= KNOWN_TWEET_STOP_STREAK:
+            print(
+                f"Hit {known_streak} already-digested tweets in a row, "
+                "the rest of the timeline was covered by earlier digests."
+            )
+            return True
+        return False
+
+    pacer = (
+        ScrollPacer(SCROLL_PAUSE_TIME, SCROLL_MAX_PAUSE_TIME)
+        if SCROLL_PACING == "adaptive"
+        else None
+    )
+
+    finished = False
     for i in range(NUM_SCROLLS):
         print(f"Scrolling down ({i + 1}/{NUM_SCROLLS})...")
+        scroll_start = time.monotonic()
         try:
-            # Scroll down
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(SCROLL_PAUSE_TIME)  # Wait for content to load
+            # Scroll down and wait for content to load
+            if pacer:
+                pacer.scroll(
+                    driver,
+                    tweet_elements_found,
+                    TARGET_TWEET_COUNT - len(scraped_tweets_data),
+                )
+            else:
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                time.sleep(SCROLL_PAUSE_TIME)
+
+            metrics.record("scroll_wait_seconds", time.monotonic() - scroll_start)
 
             # --- Scraping Logic ---
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, "html.parser")
-            tweet_articles = soup.select(TWEET_SELECTOR)
-
-            print(f"Found {len(tweet_articles)} potential tweet articles in view.")
-
-            for article in tweet_articles:
-                tweet_text_element = article.select_one('div[data-testid="tweetText"]')
-                user_name_element = article.select_one('div[data-testid="User-Name"]')
-                time_element = article.select_one(
-                    "time[datetime]"
-                )  # Find the time element
-                permalink_element = (
-                    time_element.find_parent("a") if time_element else None
-                )  # Find its parent link
-
-                tweet_text = (
-                    tweet_text_element.get_text(strip=True)
-                    if tweet_text_element
-                    else None
+            parse_start = time.monotonic()
+            if scrape_mode == "graphql":
+                # Tweets decoded from HomeTimeline responses, no DOM parsing at all
+                tweet_candidates = capture.drain()
+                print(
+                    f"Decoded {len(tweet_candidates)} tweets from timeline responses."
                 )
-
-                author = None
-                handle = None
-                if user_name_element:
-                    # Try to extract cleanly
-                    name_span = user_name_element.select_one(
-                        "span span"
-                    )  # Often nested spans for name
-                    handle_span = user_name_element.select_one(
-                        'div[dir="ltr"] span'
-                    )  # Look for the @handle specifically
-
-                    if name_span:
-                        author = name_span.get_text(strip=True)
-                    if handle_span and handle_span.get_text(strip=True).startswith("@"):
-                        handle = handle_span.get_text(strip=True)
-                    # Fallback if specific spans not found
-                    if not author and not handle:
-                        author = user_name_element.get_text(
-                            separator=" ", strip=True
-                        )  # Less precise fallback
-
-                tweet_link = None
-                if permalink_element and permalink_element.has_attr("href"):
-                    href = permalink_element["href"]
-                    # Basic check if it looks like a status link
-                    if "/status/" in href:
-                        tweet_link = f"https://x.com{href}"
-
-                # Use link as unique ID to avoid duplicates
-                if tweet_text and tweet_link and tweet_link not in tweet_elements_found:
-                    scraped_tweets_data.append(
-                        {
-                            "author": author or "Unknown Author",
-                            "handle": handle or "",
-                            "text": tweet_text,
-                            "link": tweet_link,
-                        }
+            elif scrape_mode == "observer":
+                # Articles were buffered in-page as they were inserted
+                tweet_candidates = drain_timeline_observer(driver)
+                print(f"Drained {len(tweet_candidates)} new tweets from the observer.")
+            elif scrape_mode == "js":
+                # Only articles not returned on an earlier scroll cross the wire
+                tweet_candidates = extract_new_tweets(driver, reset=(i == 0))
+                print(f"Extracted {len(tweet_candidates)} new tweet articles in view.")
+            else:
+                page_source = driver.page_source
+                metrics.record("page_source_bytes", len(page_source))
+                if snapshots:
+                    # Parsed in a worker while the next scroll loads
+                    snapshots.submit(page_source)
+                    tweet_candidates = snapshots.ready()
+                    print(
+                        f"Picked up {len(tweet_candidates)} tweets from parse workers."
                     )
-                    tweet_elements_found.add(tweet_link)
-                    print(f" Scraped: {handle or author}: {tweet_text[:50]}...")
+                else:
+                    tweet_candidates = parse_tweets_from_html(page_source, HTML_PARSER)
+                    print(f"Found {len(tweet_candidates)} potential tweets in view.")
+            metrics.record(
+                "parse_seconds", time.monotonic() - parse_start, mode=scrape_mode
+            )
+            if recorder:
+                recorder.save_page_source(
+                    page_source if scrape_mode == "dom" else driver.page_source
+                )
 
-            print(f"Total unique tweets scraped so far: {len(scraped_tweets_data)}")
-            if len(scraped_tweets_data) >= TARGET_TWEET_COUNT:
-                print("Reached target number of tweets.")
+            if collect(tweet_candidates):
+                finished = True
                 break
 
             # Check if scroll height has changed, break if stuck
@@ -269,227 +532,155 @@ def scrape_tweets(driver):
             print(f"Error during scroll/scrape iteration {i + 1}: {e}")
             # You might want to continue to the next scroll attempt
 
-    return scraped_tweets_data[:TARGET_TWEET_COUNT]  # Return up to the target count
+    if snapshots:
+        if not finished:
+            # Snapshots still being parsed when scrolling stopped
+            collect(snapshots.ready(wait=True))
+        snapshots.cancel()
+    metrics.record("tweets_scraped", len(scraped_tweets_data))
+    if BROWSER_PROFILE == "lean":
+        report_memory_usage(driver)
 
+    return scraped_tweets_data[:TARGET_TWEET_COUNT]  # Return up to the target count
 
-def get_digest_from_llm(tweets):
-    """Sends tweet text to Gemini and asks for a summarized digest."""
-    print(f"Sending {len(tweets)} scraped tweets to Gemini for summarization...")
-    if not tweets:
-        return "No tweets were scraped successfully."
 
-    # Prepare the text blob for the LLM
-    tweet_blob = ""
-    for i, tweet in enumerate(tweets):
-        tweet_blob += f"Tweet {i + 1}:\n"
-        tweet_blob += f"Author: {tweet['author']} ({tweet['handle']})\n"
-        tweet_blob += f"Text: {tweet['text']}\n"
-        tweet_blob += f"Link: {tweet['link']}\n\n"
+def record_token_usage(response, call):
+    """Records Gemini's prompt and response token counts, when it reports them."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        metrics.record("prompt_tokens", usage.prompt_token_count, call=call)
+        metrics.record("response_tokens", usage.candidates_token_count, call=call)
 
-    prompt = f"""hey, i have a bunch of tweets from my timeline that i've scraped very recently. could you pick the best 15 tweets that i would find interesting and give me a personalized daily "digest"? analyze these tweets and create a digest with the following EXACT format requirements:
 
-1. start immediately with the first category (no introductory text)
-2. use exactly these category headers in this order (skip any that have no relevant tweets):
-   ### technology & science (ai/llms/biomed/quantum/space/real breakthroughs)
-   ### world news (geopolitics, politics, u.s. news)
-   ### finance & economics
-   ### noteworthy 
+def generate_text(model, prompt, call):
+    """Calls Gemini, recording its latency and token counts under call."""
+    with metrics.timer("gemini_seconds", call=call):
+        response = model.generate_content(prompt)
+    record_token_usage(response, call)
+    if recorder:
+        recorder.save_llm_response(call, prompt, response.text)
+    return response.text
 
-3. under each category, list relevant tweets in this exact format (no numbers, they will be added automatically):
-   @handle: [1-2 sentence summary] → <a href="[tweet url]" class="tweet-link">view on X</a>
 
-4. do not include any other text, headers, or formatting
+def print_digest_progress(kind, text, elapsed):
+    """Reports each digest line as the streaming formatter renders it."""
+    print(f"  [{elapsed:5.1f}s] {'###' if kind == 'header' else '  -'} {text}")
 
-example of the exact format:
-### technology & science
-@handle: summary of the tweet goes here → <a href="https://x.com/status/123" class="tweet-link">view on X</a>
-@another: another summary here → <a href="https://x.com/status/456" class="tweet-link">view on X</a>
 
-### us news & politics
-@handle: political summary here → <a href="https://x.com/status/789" class="tweet-link">view on X</a>
+def get_digest_from_llm(tweets, force_refresh=False, formatter=None):
+    """Sends tweet text to Gemini and asks for a summarized digest.
 
-now, here are the tweets to analyze:
+    With a formatter the single-request digest is streamed into it; cached and
+    map-reduce digests are fed to it whole, so its HTML is complete either way.
+    Raises RuntimeError if there is no digest, so the digest stage fails and is
+    not checkpointed.
+    """
+    print(f"Sending {len(tweets)} scraped tweets to Gemini for summarization...")
+    if not tweets:
+        raise RuntimeError("No tweets were scraped successfully.")
 
---- START OF TWEETS ---
-{tweet_blob}
---- END OF TWEETS ---
+    # Large sets are scored in parallel batches before the final digest call
+    use_map_reduce = DIGEST_MODE == "chunked" or (
+        DIGEST_MODE == "auto" and len(tweets) > MAP_REDUCE_MIN_TWEETS
+    )
+    model_key = (
+        f"{GEMINI_MODEL_NAME}+{GEMINI_MAP_MODEL_NAME}"
+        if use_map_reduce
+        else GEMINI_MODEL_NAME
+    )
 
-now, generate the digest using the tweets above, making it feel conversational – complete sentences, natural flow, occasional wry commentary where appropriate. use lower cases. remember: start directly with "### Technology & Science" - no other text before it.
-<final_digest>
-"""
+    # Reruns over the same tweets reuse the earlier digest instead of calling Gemini
+    cache_key = digest_cache_key(model_key, PROMPT_VERSION, tweets)
+    if llm_cache and not force_refresh:
+        cached_digest = llm_cache.get(cache_key)
+        if cached_digest is not None:
+            print("Using cached Gemini digest for this set of tweets.")
+            metrics.record("llm_cache_hits", 1)
+            if formatter:
+                formatter.feed(cached_digest)
+            return cached_digest
 
     try:
-        response = gemini_model.generate_content(prompt)
+        if use_map_reduce:
+            response_text = map_reduce_digest(
+                tweets,
+                lambda prompt: generate_text(gemini_map_model, prompt, "map"),
+                lambda prompt: generate_text(gemini_model, prompt, "reduce"),
+                LLM_CHUNK_TOKENS,
+                LLM_CONCURRENCY,
+                REDUCE_SHORTLIST_SIZE,
+            )
+        else:
+            prompt = build_digest_prompt(tweets)
+            if formatter:
+                with metrics.timer("gemini_seconds", call="digest"):
+                    response = gemini_model.generate_content(prompt, stream=True)
+                    for chunk in response:
+                        if chunk.parts:  # The closing chunk may carry only metadata
+                            formatter.feed(chunk.text)
+                record_token_usage(response, "digest")
+                raw_text = formatter.text()
+                if recorder:
+                    recorder.save_llm_response("digest", prompt, raw_text)
+                timings = formatter.timings()
+                if timings["first_line"] is not None:
+                    metrics.record("gemini_first_chunk_seconds", timings["first_chunk"])
+                    metrics.record("gemini_first_line_seconds", timings["first_line"])
+                    print(
+                        f"First digest line after {timings['first_line']:.1f}s "
+                        f"(first chunk after {timings['first_chunk']:.1f}s)."
+                    )
+            else:
+                raw_text = generate_text(gemini_model, prompt, "digest")
+            # Extract text after <final_digest> tag
+            response_text = extract_final_digest(raw_text)
+        # An empty stream or a safety-blocked response must not be cached or sent
+        if not response_text.strip():
+            raise RuntimeError("Gemini returned an empty digest.")
+        if formatter and use_map_reduce:
+            formatter.feed(response_text)
         print("Gemini processing complete.")
-        # Extract text after <final_digest> tag
-        response_text = response.text
-        if "<final_digest>" in response_text:
-            response_text = response_text.split("<final_digest>")[1].strip()
+        if llm_cache:
+            llm_cache.put(cache_key, response_text, model=model_key)
         return response_text
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
-        return f"Error generating digest: {e}"
+        raise RuntimeError(f"Failed to generate digest: {e}") from e
 
 
-def format_html_email(digest_content):
-    """Formats the digest content into a basic HTML email body."""
+def format_html_email(digest_content, formatted_content=None):
+    """Formats the digest content into a basic HTML email body.
+
+    formatted_content is digest HTML already rendered by the streaming formatter;
+    without it the digest text is parsed and rendered here.
+    """
     print("Formatting HTML email...")
 
     # Get current date for the title
     current_date = time.strftime("%B %-d, %Y")
 
-    # 1. Convert ### headers to styled div elements
-    formatted_content = re.sub(
-        r"^\s*###\s+(.*?)\s*$",
-        r'<div class="category-header">\1</div>',
-        digest_content,
-        flags=re.MULTILINE,
-    )
-
-    # 2. Add hyperlinks to handles BEFORE wrapping in <li>
-    # Looks for @handle: at the start of a line
-    formatted_content = re.sub(
-        r"^@([a-zA-Z0-9_]+):",  # Capture the handle
-        # Replace with linked handle and the colon
-        r'<a href="https://x.com/\1" target="_blank" class="handle-link">@\1</a>:',
-        formatted_content,
-        flags=re.MULTILINE,
-    )
-
-    # 3. Wrap each tweet line (now starting with linked handle) into a list item
-    # This looks for lines starting with our link format and wraps the whole line
-    # It assumes the summary and the 'view on X' link are on the same logical line from the LLM output
-    formatted_content = re.sub(
-        # Match line starting with <a href...> up to the next line break
-        # or the end of the string
-        r'^(<a href="https://x.com/.*?</a>:.*?)(?:\n|$)',
-        # Wrap the matched line in <li> tags, preserving the newline/end
-        r"<li class='tweet-item'>\1</li>\n",
-        formatted_content,
-        flags=re.MULTILINE,
-    )
-    # Clean up potential trailing newline added if the last line was a tweet
-    formatted_content = formatted_content.strip()
-
-    # 4. Wrap consecutive tweet items following a header in an ordered list
-    # This regex looks for a category div followed immediately by one or more list items
-    # It wraps *only the list items* in <ol> tags. DOTALL handles multi-line content within <li> if necessary.
-    formatted_content = re.sub(
-        r"(<div class=\"category-header\">.*?</div>\s*)((?:<li class='tweet-item'>.*?</li>\s*)+)",
-        r"\1<ol class='tweet-list'>\n\2</ol>",  # Add newline for readability
-        formatted_content,
-        flags=re.DOTALL,  # Use DOTALL because <li> content might technically span lines
-    )
+    if formatted_content is None:
+        formatted_content = render_digest_body(parse_digest(digest_content))
 
-    # 5. Handle any remaining double newlines as paragraph breaks (though likely fewer now)
-    formatted_content = formatted_content.replace("\n\n", "<br><br>")
-
-    html_body = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>The X Digest</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-            }}
-            .container {{
-                max-width: 700px;
-                margin: 20px auto;
-                padding: 20px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                background-color: #fff;
-            }}
-            h1 {{
-                color: #1DA1F2; /* Twitter blue */
-                font-size: 24px;
-                margin-bottom: 16px;
-            }}
-            .category-header {{
-                color: #000000;
-                font-size: 16px;
-                font-weight: 500;
-                margin: 24px 0 12px 0;
-                padding-bottom: 4px;
-            }}
-            .tweet-list {{
-                list-style-type: disc;
-                padding-left: 20px;
-                margin: 15px 0;
-                border-left: 2px solid #eee;
-                background-color: #fdfdfd;
-                border-radius: 4px;
-                padding-top: 10px;
-                padding-bottom: 1px;
-            }}
-            .tweet-item {{
-                margin-bottom: 15px;
-                padding-left: 3px;
-                font-size: 14px;
-                line-height: 1.5;
-            }}
-            a {{
-                color: #1DA1F2;
-                text-decoration: none;
-            }}
-            a:hover {{
-                text-decoration: underline;
-            }}
-            .handle-link {{ /* Style for the handle link */
-                /* font-weight: bold; */ /* Optionally make handle bold */
-                 color: #14171A; /* Darker color for handle */
-            }}
-            .tweet-link {{ /* Style for the 'view on X' link */
-                font-size: 0.9em;
-                /* margin-left: 5px; */ /* Add space before the link */
-            }}
-            .intro-text {{
-                font-size: 14px;
-                color: #333;
-                margin: 16px 0;
-            }}
-             hr {{
-                border: none;
-                border-top: 1px solid #eee;
-                margin: 20px 0;
-             }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>The X Digest — {current_date}</h1>
-            <p class="intro-text">Here's your daily dose of what's happening, curated from your timeline. Buckle up!</p>
-            <hr>
-            {formatted_content}
-            <hr>
-            <p style="font-size: 0.8em; color: #777;">
-                Generated by X Digest Bot. Remember that scraping can be unreliable.
-            </p>
-        </div>
-    </body>
-    </html>
-    """
+    html_body = render_email(formatted_content, current_date)
     # print(html_body) # Optional: print HTML for debugging
     return html_body
 
 
-def send_email(html_content):
+def send_email(html_content, subject=None):
     """Sends the HTML email using the Resend API."""
     print(f"Sending email digest to {RECIPIENT_EMAIL}...")
     try:
         current_date = time.strftime("%B %-d, %Y")
+        subject = subject or f"Your Daily X Digest — {current_date}"
         params = {
             "from": f"X Digest <{SENDER_EMAIL}>",
             "to": [RECIPIENT_EMAIL],
-            "subject": f"Your Daily X Digest — {current_date}",
+            "subject": subject,
             "html": html_content,
         }
-        email = resend.Emails.send(params)
+        with metrics.timer("email_seconds", method="single"):
+            email = resend.Emails.send(params)
         print(f"Email sent successfully! ID: {email['id']}")
         return True
     except Exception as e:
@@ -504,47 +695,394 @@ def send_email(html_content):
         return False
 
 
-# --- Main Execution ---
-if __name__ == "__main__":
-    driver = None  # Initialize driver to None
+def send_resend_batch(params, idempotency_key):
+    """Sends one Resend batch request."""
+    metrics.record("emails_per_batch", len(params))
+    with metrics.timer("email_seconds", method="batch"):
+        return resend.Batch.send(params, {"idempotency_key": idempotency_key})
+
+
+def send_digest(digest_content, html_content, digest_id, account_name=None):
+    """Sends the digest to everyone in RECIPIENTS_FILE, or to RECIPIENT_EMAIL.
+
+    With an outbox the emails are persisted first, so a failed send is retried
+    later instead of redoing the scrape and Gemini call. digest_id (the run, and
+    account) keeps a resumed run from sending its digest twice. account_name
+    labels a per-account digest in the subject.
+    """
+    current_date = time.strftime("%B %-d, %Y")
+    subject = f"Your Daily X Digest — {current_date}"
+    if account_name:
+        subject = f"Your Daily X Digest ({account_name}) — {current_date}"
+
+    recipients = load_recipients(RECIPIENTS_FILE)
+    if not recipients:
+        if not outbox:
+            return send_email(html_content, subject)
+        recipients = [Recipient(RECIPIENT_EMAIL, None)]
+
+    messages = build_messages(
+        parse_digest(digest_content),
+        recipients,
+        sender=f"X Digest <{SENDER_EMAIL}>",
+        subject=subject,
+        digest_id=digest_id,
+        render=lambda digest: render_email(render_digest_body(digest), current_date),
+        full_html=html_content,
+    )
+    if outbox:
+        delivered = outbox.enqueue(messages)
+        delivered += outbox.flush(send_resend_batch, DELIVERY_CONCURRENCY)
+        mark_delivered_digests(delivered)
+    else:
+        delivered = deliver_messages(messages, send_resend_batch, DELIVERY_CONCURRENCY)
+
+    # Older messages retried from the outbox don't count toward this digest
+    keys = {message["key"] for message in messages}
+    return any(message["key"] in keys for message in delivered)
+
+
+def mark_delivered_digests(delivered):
+    """Marks the tweets of every digest in delivered as digested.
+
+    This covers digests of earlier runs that only reached the inbox on a later
+    outbox flush, after their own send stage had failed.
+    """
+    digest_ids = sorted(
+        {message["digest"] for message in delivered if message.get("digest")}
+    )
+    if not TWEET_STORE_PATH or not digest_ids:
+        return
+    store = TweetStore(TWEET_STORE_PATH)
     try:
-        driver = setup_driver()
+        for digest_id in digest_ids:
+            # The scrape checkpoint of the run, or of an account sub-run
+            # (<run>/<account>, only with ACCOUNT_DIGESTS=separate)
+            path = os.path.join(RUNS_DIR, digest_id, "tweets.json")
+            account = digest_id.partition("/")[2]
+            try:
+                with open(path, encoding="utf-8") as f:
+                    store.mark_digested(json.load(f), account)
+            except (OSError, ValueError) as e:
+                print(f"Could not mark the tweets of {digest_id} as digested: {e}")
+    finally:
+        store.close()
 
-        # --- Automated Login Step ---
-        login_successful = login_to_x(driver, X_USERNAME, X_PASSWORD)
 
-        if not login_successful:
-            print("Exiting script due to login failure.")
-            exit()  # Exit if login fails
+def archive_tweets(run_id, tweets):
+    """Appends a run's scraped tweets to the archive; failing never stops the run."""
+    if not archive:
+        return
+    try:
+        path = archive.append(run_id, tweets)
+        print(f"Archived {len(tweets)} tweets to {path}.")
+    except Exception as e:
+        print(f"Could not archive the scraped tweets: {e}")
 
-        # --- Scrape Tweets ---
-        scraped_tweets = scrape_tweets(driver)
 
-        if not scraped_tweets:
-            print("No tweets were scraped. Exiting.")
-            exit()
+def update_search_index(run_directory):
+    """Indexes a finished (or failed) run's checkpoints for python -m x_digest.search."""
+    if not SEARCH_INDEX_PATH:
+        return
+    try:
+        index = SearchIndex(SEARCH_INDEX_PATH)
+        try:
+            index_run(index, RUNS_DIR, run_directory)
+        finally:
+            index.close()
+    except Exception as e:
+        print(f"Could not update the search index: {e}")
+
 
+def run_digest_pipeline(args):
+    """Runs (or resumes) one digest run: scrape, digest, html and send."""
+    if outbox:
+        # Emails that failed on an earlier run go out before the new digest
+        mark_delivered_digests(outbox.flush(send_resend_batch, DELIVERY_CONCURRENCY))
+
+    accounts = load_accounts(ACCOUNTS_FILE)
+    browser = {}  # Driver and daemon lease, opened only if the scrape stage runs
+    store = TweetStore(TWEET_STORE_PATH) if TWEET_STORE_PATH else None
+    # Worker processes start on the first snapshot and are shut down with the run
+    parse_pool = ParsePool(PARSE_WORKERS, HTML_PARSER) if PARSE_WORKERS else None
+
+    # --- Scrape Tweets ---
+    def scrape_stage(run):
+        browser["lease"] = acquire_warm_browser(
+            BROWSER_DAEMON_PORT, BROWSER_DAEMON_FILE
+        )
+        if browser["lease"]:
+            # The daemon has already logged in and loaded a fresh home timeline
+            browser["driver"] = attach_driver(
+                browser["lease"].debugger_address,
+                DRIVER_CACHE_FILE,
+                capture_network=(SCRAPE_MODE == "graphql"),
+            )
+            if SCRAPE_MODE == "graphql":
+                # Reload so the first timeline response lands in this session's log
+                browser["driver"].refresh()
+        else:
+            browser["driver"] = setup_driver()
+
+            # --- Automated Login Step ---
+            if not ensure_logged_in(browser["driver"]):
+                raise RuntimeError("Login failed.")
+
+        scraped_tweets = scrape_tweets(browser["driver"], store, parse_pool)
+        if not scraped_tweets:
+            raise RuntimeError("No tweets were scraped.")
         print(f"\nSuccessfully scraped {len(scraped_tweets)} unique tweets.")
+        archive_tweets(run.run_id, scraped_tweets)
+        return scraped_tweets
+
+    def scrape_accounts_stage(run):
+        # Every account gets its own browser from the pool; a pooled browser is
+        # logged out before it is handed to the next account
+        pool = BrowserPool(
+            # Concurrent Chromes cannot share one profile directory
+            lambda: setup_driver(profile_dir=None, exit_on_error=False),
+            BROWSER_POOL_SIZE,
+            reset=clear_session,
+        )
+        try:
+            results = scrape_accounts(
+                accounts,
+                pool,
+                lambda driver, account: scrape_account(
+                    driver, account, store, parse_pool
+                ),
+            )
+        finally:
+            pool.close()
 
-        # --- Get LLM Digest ---
-        digest = get_digest_from_llm(scraped_tweets)
+        scraped_tweets = merge_account_tweets(results)
+        if not scraped_tweets:
+            raise RuntimeError("No tweets were scraped.")
+        print(
+            f"\nSuccessfully scraped {len(scraped_tweets)} unique tweets "
+            f"from {len(results)} accounts."
+        )
+        archive_tweets(run.run_id, scraped_tweets)
+        return scraped_tweets
+
+    # --- Get LLM Digest ---
+    def digest_stage(run):
+        # Collapse near-duplicates (one tweet per story), then pre-rank locally so
+        # only the top candidates are sent to Gemini
+        candidate_tweets = collapse_near_duplicates(
+            run.output("scrape"), NEAR_DUPLICATE_THRESHOLD
+        )
+        candidate_tweets = prerank_tweets(
+            candidate_tweets, PRERANK_TOP_N, load_author_weights(AUTHOR_WEIGHTS_FILE)
+        )
 
-        if "Error:" in digest:
-            print(f"Failed to generate digest: {digest}")
-            exit()
+        formatter = (
+            StreamingDigestFormatter(on_line=print_digest_progress)
+            if STREAM_DIGEST
+            else None
+        )
+        digest = get_digest_from_llm(
+            candidate_tweets, force_refresh=args.refresh_digest, formatter=formatter
+        )
 
         print("\n--- Generated Digest ---")
         print(digest)
         print("--- End of Digest ---\n")
 
-        # --- Format and Send Email ---
-        html_email_body = format_html_email(digest)
-        send_email(html_email_body)
+        # get_digest_from_llm has fed the whole digest to the formatter or raised
+        if formatter:
+            run.memo["formatted_digest"] = formatter.finish()
+        return digest
+
+    # --- Format and Send Email ---
+    def html_stage(run):
+        return format_html_email(run.output("digest"), run.memo.get("formatted_digest"))
+
+    def send_stage(run):
+        # Runs and account sub-runs each get their own keys: RUNS_DIR/<run>[/<account>]
+        digest_id = os.path.relpath(run.directory, RUNS_DIR)
+        if not send_digest(
+            run.output("digest"), run.output("html"), digest_id, run.memo.get("account")
+        ):
+            raise RuntimeError("The digest email was not delivered.")
+        if store:
+            # Only tweets that actually reached the inbox count as digested (including
+            # ones the pre-ranking passed over, so they are not reconsidered forever)
+            store.mark_digested(run.output("scrape"), run.memo.get("account", ""))
+        return {"sent_at": time.time()}
+
+    digest_stages = [
+        Stage("digest", digest_stage, "digest.txt"),
+        Stage("html", html_stage, "digest.html"),
+        Stage("send", send_stage, "sent.json"),
+    ]
 
+    def account_digests_stage(run):
+        # Each account's digest is a pipeline of its own under this run, so a
+        # resumed run redoes only the accounts that did not finish
+        failed = []
+        for account in accounts:
+            account_run = PipelineRun(
+                [
+                    Stage(
+                        "scrape",
+                        lambda account_run, name=account.name: [
+                            tweet
+                            for tweet in run.output("scrape")
+                            if name in tweet["accounts"]
+                        ],
+                        "tweets.json",
+                    )
+                ]
+                + digest_stages,
+                run.directory,
+                account.name,
+                metrics,
+            )
+            account_run.memo["account"] = account.name
+            try:
+                account_run.run(
+                    resume=True,
+                    only=(
+                        args.stage if args.stage in ("digest", "html", "send") else None
+                    ),
+                )
+            except Exception as e:
+                print(f"[{account.name}] Digest failed: {e}")
+                failed.append(account.name)
+        if failed:
+            raise RuntimeError(f"Digests failed for {', '.join(failed)}.")
+        return [account.name for account in accounts]
+
+    run_id = args.run_id
+    if not run_id and (args.resume or args.stage):
+        run_id = latest_run_id(RUNS_DIR)
+    only_stage = args.stage
+    if accounts:
+        stages = [Stage("scrape", scrape_accounts_stage, "tweets.json")]
+        if ACCOUNT_DIGESTS == "separate":
+            stages.append(Stage("accounts", account_digests_stage, "accounts.json"))
+            if only_stage and only_stage != "scrape":
+                only_stage = "accounts"  # Passed on to each account's pipeline
+        else:
+            stages += digest_stages
+    else:
+        stages = [Stage("scrape", scrape_stage, "tweets.json")] + digest_stages
+    pipeline = PipelineRun(stages, RUNS_DIR, run_id or new_run_id(), metrics)
+    metrics.start_run(pipeline.run_id)
+    if recorder:
+        recorder.start_run(pipeline.run_id)
+    try:
+        pipeline.run(resume=args.resume, only=only_stage)
     except Exception as e:
         print(f"\nAn unexpected error occurred in the main script: {e}")
     finally:
-        if driver:
+        if browser.get("lease"):
+            # Ends only this driver session; the daemon's Chrome keeps running
+            print("Returning warm browser to the daemon...")
+            if browser.get("driver"):
+                browser["driver"].quit()
+            browser["lease"].release()
+        elif browser.get("driver"):
             print("Closing browser...")
-            driver.quit()
+            browser["driver"].quit()
+        if parse_pool:
+            parse_pool.close()
+        if store:
+            store.close()
+        update_search_index(pipeline.directory)
+        metrics.write_prometheus()
         print("Script finished.")
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scrape your X timeline and email yourself a Gemini digest."
+    )
+    parser.add_argument(
+        "--browser-daemon",
+        action="store_true",
+        help="keep a warm, logged-in browser running for later runs to reuse",
+    )
+    parser.add_argument(
+        "--refresh-digest",
+        action="store_true",
+        help="call Gemini even if a cached digest exists for the scraped tweets",
+    )
+    parser.add_argument(
+        "--flush-outbox",
+        action="store_true",
+        help="retry undelivered emails until the outbox is empty, then exit",
+    )
+    parser.add_argument(
+        "--run-id",
+        help="name of the run whose checkpoints to use (default: a new run, or "
+        "the latest one with --resume/--stage)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue a run from its first stage without a checkpoint",
+    )
+    parser.add_argument(
+        "--schedule",
+        nargs="?",
+        const=DIGEST_SCHEDULE or "@hourly",
+        metavar="CRON",
+        help="stay running and start a digest run on this cron schedule "
+        '(e.g. "0 * * * *"; default DIGEST_SCHEDULE or hourly)',
+    )
+    parser.add_argument(
+        "--stage",
+        choices=PIPELINE_STAGES,
+        help="run only this stage, reading earlier stages from checkpoints",
+    )
+    args = parser.parse_args()
+
+    if args.flush_outbox:
+        if outbox:
+            outbox.drain(
+                send_resend_batch, DELIVERY_CONCURRENCY, mark_delivered_digests
+            )
+        exit()
+
+    if args.browser_daemon:
+        BrowserDaemon(
+            lambda port: setup_driver(remote_debugging_port=port),
+            ensure_logged_in,
+            BROWSER_DAEMON_FILE,
+        ).serve(BROWSER_DAEMON_PORT)
+        exit()
+
+    if args.schedule:
+        warm_browser = None
+        if SCHEDULE_WARM_BROWSER:
+            # Runs borrow this browser through the regular daemon protocol
+            warm_browser = threading.Thread(
+                target=BrowserDaemon(
+                    lambda port: setup_driver(remote_debugging_port=port),
+                    ensure_logged_in,
+                    BROWSER_DAEMON_FILE,
+                ).serve,
+                args=(BROWSER_DAEMON_PORT,),
+                daemon=True,
+            )
+            warm_browser.start()
+        try:
+            Scheduler(
+                CronSchedule(args.schedule),
+                lambda: run_digest_pipeline(args),
+                SCHEDULE_STATE_FILE,
+                jitter=SCHEDULE_JITTER,
+                missed=MISSED_RUN_POLICY,
+            ).run_forever()
+        finally:
+            if warm_browser and warm_browser.is_alive():
+                send_daemon_command(
+                    BROWSER_DAEMON_PORT, "shutdown", BROWSER_DAEMON_FILE
+                )
+                warm_browser.join(timeout=10)
+        exit()
+
+    run_digest_pipeline(args)